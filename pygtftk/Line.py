@@ -7,19 +7,49 @@ returned respectively:
     - FieldSet
     - FastaSequence
 
+A FeatureWriter can be passed to the write methods of these objects to
+buffer the output.
+
 """
 
-from collections import OrderedDict
+import sys
+from collections.abc import MutableMapping
+from operator import attrgetter
+from sys import intern
 
 from cffi import FFI
 
-import pygtftk.utils
 import pygtftk.utils
 from pygtftk.utils import GTFtkError
 from pygtftk.utils import write_properly
 
 ffi = FFI()
 
+# ---------------------------------------------------------------
+# Serialization of Feature objects. The Cython version is used
+# if compiled (see setup.py).
+# ---------------------------------------------------------------
+
+try:
+    from pygtftk._line_fmt import join_attr
+    from pygtftk._line_fmt import format_feature_tab
+except ImportError:
+
+    def join_attr(keys, vals):
+        return ' '.join([k + ' "' + v + '";' for k, v in zip(keys, vals)])
+
+
+    def format_feature_tab(chrom, src, ft_type, start, end, score, strand,
+                           frame, values, sep):
+        return sep.join([chrom,
+                         src,
+                         ft_type,
+                         str(start),
+                         str(end),
+                         score,
+                         strand,
+                         frame] + values)
+
 
 # ---------------------------------------------------------------
 # Classes FieldSet
@@ -30,6 +60,8 @@ ffi = FFI()
 class FieldSet(object):
     """A class representating a set of Fields obtained from a splitted line."""
 
+    __slots__ = ('fields', 'size', '_ft_type')
+
     def __init__(self, ptr=None, size=None, alist=None, ft_type=None):
         """
         :param ptr: A pointer to a gtf line.
@@ -55,12 +87,47 @@ class FieldSet(object):
             self.fields = [x for x in alist]
         else:
             raise GTFtkError('Unsupported type.')
-        if ft_type is not None:
-            for i in range(len(ft_type)):
-                setattr(self, ft_type[i], self.fields[i])
-
+        self._ft_type = ft_type
         self.size = len(self.fields)
 
+    @classmethod
+    def _from_batch(cls, fields, ft_type=None):
+        """Create a FieldSet from a list of strings obtained from a block of
+        rows (see TAB.__iter__). The list is used as is (not copied).
+
+        :param fields: The list of fields.
+        :param ft_type: The column names.
+
+        :Example:
+
+        >>> from pygtftk.Line import FieldSet
+        >>> a = FieldSet._from_batch(['chr1', '123'], ['chrom', 'start'])
+        >>> assert a.chrom == 'chr1'
+        >>> assert len(a) == 2
+        """
+        field_set = cls.__new__(cls)
+        field_set.fields = fields
+        field_set._ft_type = ft_type
+        field_set.size = len(fields)
+        return field_set
+
+    def __getattr__(self, name):
+        """Fields can also be accessed using the column names (ft_type).
+
+        :Example:
+
+        >>> from pygtftk.Line import FieldSet
+        >>> a = FieldSet(alist=['chr1', '123', '456'], ft_type=['chrom', 'start', 'end'])
+        >>> assert a.start == '123'
+
+        """
+        if name.startswith('_') or self._ft_type is None:
+            raise AttributeError(name)
+        try:
+            return self.fields[self._ft_type.index(name)]
+        except ValueError:
+            raise AttributeError(name)
+
     def __repr__(self):
         return '\t'.join([str(x) for x in self.fields])
 
@@ -157,7 +224,7 @@ class FieldSet(object):
 
         """
 
-        pygtftk.utils.write_properly(separator.join(list(self)), file_out)
+        write_properly(separator.join(list(self)), file_out)
 
 
 # ---------------------------------------------------------------
@@ -170,6 +237,9 @@ class FieldSet(object):
 class FastaSequence(object):
     """A class representating a fasta file line."""
 
+    __slots__ = ('header', 'chrom', 'strand', 'gene_id', 'transcript_id',
+                 'sequence', 'start', 'end', 'feat')
+
     def __init__(self, ptr=None, alist=None, feat="transcript", rev_comp=False):
         """
         :param ptr: A pointer to a fasta sequence.
@@ -252,7 +322,7 @@ class FastaSequence(object):
 
         """
 
-        pygtftk.utils.write_properly(self.format(), file_out)
+        write_properly(self.format(), file_out)
 
 
 # ---------------------------------------------------------------
@@ -260,13 +330,91 @@ class FastaSequence(object):
 #
 # ---------------------------------------------------------------
 
+# Position of the 5' end in (start, end) according to strand
+_STRAND_IDX = {'+': 0, '-': 1}
+
+
+def _column(name, conv=str):
+    """Returns a property for a Feature column stored in slot '_' + name.
+    Values are converted with conv (so that write methods do not need to call
+    str() on them). Setting the column resets the cached GTF line (see
+    Feature.format())."""
+    slot = '_' + name
+
+    def setter(self, value):
+        setattr(self, slot, conv(value))
+        self._formatted = None
+
+    return property(attrgetter(slot), setter, doc="The '" + name + "' column.")
+
+
+
+class _FeatureAttr(MutableMapping):
+    """A dict-like view over the attributes of a Feature (see Feature.attr).
+    Modifications are applied to the Feature (key/value lists and cached
+    GTF line)."""
+
+    __slots__ = ('_feat',)
+
+    def __init__(self, feat):
+        self._feat = feat
+
+    def __getitem__(self, key):
+        val = self._feat._get_attr(key)
+        if val is None:
+            raise KeyError(key)
+        return val
+
+    def __setitem__(self, key, val):
+        self._feat.add_attr(key, val)
+
+    def __delitem__(self, key):
+        feat = self._feat
+        feat._ensure_attr()
+        try:
+            pos = feat._keys.index(key)
+        except ValueError:
+            raise KeyError(key)
+        del feat._keys[pos]
+        del feat._vals[pos]
+        feat._attr_str = None
+        feat._formatted = None
+
+    def __iter__(self):
+        self._feat._ensure_attr()
+        return iter(list(self._feat._keys))
+
+    def __len__(self):
+        self._feat._ensure_attr()
+        return len(self._feat._keys)
+
+    def __repr__(self):
+        return repr(dict(self))
+
 
 class Feature(object):
-    """Class representation of a genomic feature. Corresponds to a GTF line."""
+    """Class representation of a genomic feature. Corresponds to a GTF line.
+    Attributes (last column) are stored as two lists of keys and values
+    (typically a few items) that are scanned sequentially. When read from a
+    GTF, these lists are only built upon first need (e.g. modification),
+    the flat list of key/value tokens (_attr_raw) being used until then.
+    The GTF line (except the chromosome) is cached by format() until the
+    Feature is modified."""
+
+    __slots__ = ('rank', 'nb_key', '_chrom', '_src', '_ft_type',
+                 '_start', '_end', '_score', '_strand', '_strand_idx', '_frame',
+                 '_keys', '_vals', '_attr_raw', '_attr_str', '_formatted')
+
+    src = _column('src')
+    ft_type = _column('ft_type')
+    start = _column('start', int)
+    end = _column('end', int)
+    score = _column('score')
+    frame = _column('frame')
 
     def __init__(self, ptr=None, alist=None):
         """
-        :param ptr: A pointer to a gtf line.
+        :param ptr: A pointer to a gtf line (GTF_ROW).
         :param alist: A list if one want to construct a Feature from a list.
 
         :Example:
@@ -288,40 +436,96 @@ class Feature(object):
         >>> a_gtf = GTF(a_file)
         >>> for i in a_gtf: pass
         >>> assert type(i) == Feature
+        >>> a = Feature(ptr=a_gtf._data.data[0])
+        >>> assert a.format() == next(iter(a_gtf)).format()
         """
 
         if ptr is not None:
-            self.rank = ptr.rank
-            self.nb_key = ptr.attributes.nb
-            self.chrom = ffi.string(ptr.field[0]).decode()
-            self.src = ffi.string(ptr.field[1]).decode()
-            self.ft_type = ffi.string(ptr.field[2]).decode()
-            self.start = int(ffi.string(ptr.field[3]).decode())
-            self.end = int(ffi.string(ptr.field[4]).decode())
-            self.score = ffi.string(ptr.field[5]).decode()
-            self.strand = ffi.string(ptr.field[6]).decode()
-            self.frame = ffi.string(ptr.field[7]).decode()
-            self.attr = OrderedDict()
-            n = 0
-            while n < self.nb_key:
-                self.attr[ffi.string(ptr.attributes.attr[n].key).decode()] = ffi.string(
-                    ptr.attributes.attr[n].value).decode()
-                n += 1
+            nb_key = ptr.attributes.nb
+            tok = [str(ptr.rank), str(nb_key)]
+            tok += [ffi.string(ptr.field[x]).decode() for x in range(8)]
+            attrs = ptr.attributes.attr
+            for n in range(nb_key):
+                a = attrs[n]
+                tok += [ffi.string(a.key).decode(),
+                        ffi.string(a.value).decode()]
+            self._set_from_batch(tok, 0)
         elif alist is not None:
             self.rank = 1
             self.nb_key = len(alist[8])
-            self.chrom = alist[0]
+            self.chrom = str(alist[0])
             self.src = alist[1]
             self.ft_type = alist[2]
-            self.start = int(alist[3])
-            self.end = int(alist[4])
+            self.start = alist[3]
+            self.end = alist[4]
             self.score = alist[5]
-            self.strand = alist[6]
+            self.strand = str(alist[6])
             self.frame = alist[7]
-            self.attr = alist[8]
+            self._keys = list(alist[8].keys())
+            self._vals = [str(x) for x in alist[8].values()]
+            self._attr_raw = None
+            self._attr_str = None
+            self._formatted = None
         else:
             raise GTFtkError('Arguments alist or ptr should be set.')
 
+    @classmethod
+    def _from_batch(cls, tok, pos):
+        """Create a Feature from a block of tokens as returned by the
+        get_rows_block() function of libgtftk (see GTF.__iter__). A row is
+        stored as: rank, number of attributes, the 8 first fields and the
+        key/value pairs of the attributes. The next row starts at
+        pos + 10 + 2 * nb_key.
+
+        :param tok: The list of tokens of the block.
+        :param pos: The position of the first token of the row in tok.
+
+        :Example:
+
+        >>> from pygtftk.Line import Feature
+        >>> tok = ['1', '2', 'chr1', 'Unknown', 'transcript', '100', '200', '.', '+', '.']
+        >>> tok += ['transcript_id', 'g1t1', 'gene_id', 'g1']
+        >>> a = Feature._from_batch(tok, 0)
+        >>> assert a.get_tx_id() == 'g1t1'
+        >>> assert a.get_gn_id() == 'g1'
+        >>> assert a.end == 200
+        """
+
+        feat = cls.__new__(cls)
+        feat._set_from_batch(tok, pos)
+        return feat
+
+    def _set_from_batch(self, tok, pos):
+        """Set the columns and attributes from a block of tokens (see
+        _from_batch())."""
+        self.rank = int(tok[pos])
+        self.nb_key = int(tok[pos + 1])
+        (chrom,
+         src,
+         ft_type,
+         start,
+         end,
+         self._score,
+         strand,
+         frame) = tok[pos + 2:pos + 10]
+        # Low cardinality columns are interned so that
+        # features share the same string objects.
+        # Slots are set directly (not through the
+        # column properties) in this hot path.
+        self.chrom = intern(chrom)
+        self._src = intern(src)
+        self._ft_type = intern(ft_type)
+        self.strand = intern(strand)
+        self._frame = intern(frame)
+        self._start = int(start)
+        self._end = int(end)
+        last = pos + 10 + 2 * self.nb_key
+        self._keys = None
+        self._vals = None
+        self._attr_raw = tok[pos + 10:last]
+        self._attr_str = None
+        self._formatted = None
+
     @classmethod
     def from_list(cls,
                   a_list):
@@ -353,6 +557,137 @@ class Feature(object):
     def __str__(self):
         return self.__repr__()
 
+    @property
+    def chrom(self):
+        """The chromosome (seqid).
+
+        :Example:
+
+        >>> from pygtftk.utils import get_example_feature
+        >>> feat = get_example_feature()
+        >>> feat.chrom = 'chr2'
+        >>> assert feat.format().startswith('chr2')
+
+        """
+        return self._chrom
+
+    @chrom.setter
+    def chrom(self, value):
+        self._chrom = value
+        self._formatted = None
+
+    @property
+    def _chrom_out(self):
+        """The chromosome name used for writing (with 'chr' prefix if
+        pygtftk.utils.ADD_CHR is set)."""
+        if pygtftk.utils.ADD_CHR == 1:
+            return 'chr' + self._chrom
+        return self._chrom
+
+    @property
+    def strand(self):
+        """The strand. Its position in (start, end) for the 5' end (0 for
+        '+', 1 for '-', -1 if unstranded) is computed when it is set.
+
+        :Example:
+
+        >>> from pygtftk.utils import get_example_feature
+        >>> feat = get_example_feature()
+        >>> feat.strand = '-'
+        >>> assert feat.get_5p_end() == 200
+
+        """
+        return self._strand
+
+    @strand.setter
+    def strand(self, value):
+        self._strand = value
+        self._formatted = None
+        self._strand_idx = _STRAND_IDX.get(value, -1)
+
+    @property
+    def attr(self):
+        """The attributes as a dict-like object. Modifying it modifies the
+        Feature.
+
+        :Example:
+
+        >>> from pygtftk.utils import get_example_feature
+        >>> feat = get_example_feature()
+        >>> assert feat.attr['gene_id'] == 'g1'
+        >>> feat.attr['gene_id'] = 'g2'
+        >>> feat.attr['foo'] = 'bar'
+        >>> del feat.attr['transcript_id']
+        >>> assert feat.format().endswith('gene_id "g2"; foo "bar";')
+        >>> feat.attr = {'gene_id': 'g1'}
+        >>> assert dict(feat.attr) == {'gene_id': 'g1'}
+
+        """
+        return _FeatureAttr(self)
+
+    @attr.setter
+    def attr(self, value):
+        self._keys = list(value.keys())
+        self._vals = [str(x) for x in value.values()]
+        self._attr_raw = None
+        self._attr_str = None
+        self._formatted = None
+
+    def _ensure_attr(self):
+        """Build the key and value lists from the raw attribute tokens. As
+        with a dict, a repeated key (e.g. 'tag' in Ensembl GTFs) is kept once,
+        at its first position, with its last value.
+
+        :Example:
+
+        >>> from pygtftk.Line import Feature
+        >>> tok = ['1', '3', 'chr1', 'Unknown', 'transcript', '100', '200', '.', '+', '.']
+        >>> tok += ['gene_id', 'g1', 'tag', 'basic', 'tag', 'CCDS']
+        >>> a = Feature._from_batch(tok, 0)
+        >>> a.add_attr('foo', 'bar')
+        >>> assert a.get_attr_names() == ['gene_id', 'tag', 'foo']
+        >>> assert a.get_attr_value('tag') == ['CCDS']
+        >>> assert a.format().endswith('gene_id "g1"; tag "CCDS"; foo "bar";')
+        >>> a.set_attr('tag', 'basic')
+        >>> assert a.format().endswith('gene_id "g1"; tag "basic"; foo "bar";')
+        """
+        if self._keys is None:
+            keys = list(map(intern, self._attr_raw[0::2]))
+            vals = self._attr_raw[1::2]
+            if len(set(keys)) < len(keys):
+                attr = dict(zip(keys, vals))
+                keys = list(attr)
+                vals = list(attr.values())
+            self._keys = keys
+            self._vals = vals
+            self._attr_raw = None
+
+    def _get_attr(self, key, default=None):
+        """Get the value of an attribute or default if not found. The last
+        value is returned if the key is repeated (see _ensure_attr()).
+
+        :Example:
+
+        >>> from pygtftk.Line import Feature
+        >>> tok = ['1', '3', 'chr1', 'Unknown', 'transcript', '100', '200', '.', '+', '.']
+        >>> tok += ['gene_id', 'g1', 'tag', 'basic', 'tag', 'CCDS']
+        >>> a = Feature._from_batch(tok, 0)
+        >>> assert a._get_attr('tag') == 'CCDS'
+        >>> assert a._get_attr('basic') is None
+        >>> assert a._attr_raw is not None
+        """
+        if self._keys is None:
+            # Search the raw tokens backward (keys are at even positions).
+            raw = self._attr_raw
+            for pos in range(len(raw) - 2, -1, -2):
+                if raw[pos] == key:
+                    return raw[pos + 1]
+            return default
+        try:
+            return self._vals[self._keys.index(key)]
+        except ValueError:
+            return default
+
     def get_tx_id(self):
         """Get value for 'transcript_id' attribute.
 
@@ -364,10 +699,7 @@ class Feature(object):
 
         """
 
-        try:
-            return self.attr['transcript_id']
-        except:
-            return None
+        return self._get_attr('transcript_id')
 
     def get_gn_id(self):
         """Get value for 'gene_id' attribute.
@@ -379,7 +711,10 @@ class Feature(object):
         >>> assert feat.get_gn_id() == 'g1'
 
         """
-        return self.attr['gene_id']
+        gene_id = self._get_attr('gene_id')
+        if gene_id is None:
+            raise KeyError('gene_id')
+        return gene_id
 
     def get_5p_end(self):
         """Get the 5' end of the feature. Returns 'start' if on '+' strand 'end'
@@ -400,12 +735,10 @@ class Feature(object):
 
         """
 
-        if self.strand == '+':
-            return self.start
-        elif self.strand == '-':
-            return self.end
-        else:
+        idx = self._strand_idx
+        if idx < 0:
             raise GTFtkError("Can not retrieve 5'end from an unstranded features.")
+        return (self.start, self.end)[idx]
 
     def get_3p_end(self):
         """Get the 3' end of the feature. Returns 'end' if on '+' strand 'start'
@@ -419,12 +752,10 @@ class Feature(object):
 
         """
 
-        if self.strand == '+':
-            return self.end
-        elif self.strand == '-':
-            return self.start
-        else:
+        idx = self._strand_idx
+        if idx < 0:
             raise GTFtkError("Can not retrieve 3'end from an unstranded features.")
+        return (self.end, self.start)[idx]
 
     def get_attr_names(self):
         """Returns the attribute names from the Feature.
@@ -437,7 +768,8 @@ class Feature(object):
         >>> assert 'gene_id' in feat.get_attr_names()
 
         """
-        return list(self.attr.keys())
+        self._ensure_attr()
+        return list(self._keys)
 
     def format(self):
         """
@@ -450,29 +782,24 @@ class Feature(object):
         >>> from pygtftk.utils import TAB
         >>> feat = get_example_feature()
         >>> assert len(feat.format().split(TAB)) == 9
+        >>> import pygtftk.utils
+        >>> pygtftk.utils.ADD_CHR = 1
+        >>> assert feat.format().startswith('chrchr1')
+        >>> pygtftk.utils.ADD_CHR = 0
+        >>> assert feat.format().startswith('chr1')
 
         """
 
-        tok_list = list()
-        for key, val in list(self.attr.items()):
-            tok_list += [key + ' "' + val + '";']
-
-        if pygtftk.utils.ADD_CHR == 1:
-            chrom_out = 'chr' + self.chrom
-        else:
-            chrom_out = self.chrom
+        # The chromosome is not cached (see pygtftk.utils.ADD_CHR).
+        if self._formatted is None:
+            if self._attr_str is None:
+                self._ensure_attr()
+                self._attr_str = join_attr(self._keys, self._vals)
 
-        token = [chrom_out,
-                 self.src,
-                 self.ft_type,
-                 str(self.start),
-                 str(self.end),
-                 str(self.score),
-                 self.strand,
-                 str(self.frame),
-                 ' '.join(tok_list)]
+            self._formatted = f"\t{self._src}\t{self._ft_type}\t{self._start}\t" \
+                              f"{self._end}\t{self._score}\t{self._strand}\t{self._frame}\t{self._attr_str}"
 
-        return '\t'.join(token)
+        return self._chrom_out + self._formatted
 
     def format_tab(self, attr_list, sep="\t"):
         r"""Returns Feature as a string in tabulated format.
@@ -490,25 +817,56 @@ class Feature(object):
 
         """
         if isinstance(attr_list, str):
-            attr_list = [attr_list]
+            return self.format_tab_single(attr_list, sep)
 
         tok = list()
-        token = [self.chrom,
-                 self.src,
-                 self.ft_type,
-                 str(self.start),
-                 str(self.end),
-                 str(self.score),
-                 self.strand,
-                 str(self.frame)]
         for attr_name in attr_list:
-            if self.attr.get(attr_name):
-                tok.append(self.attr[attr_name])
+            val = self._get_attr(attr_name)
+            if val:
+                tok.append(val)
             else:
                 tok.append('NA')
 
-        token = token + tok
-        return sep.join(token)
+        return format_feature_tab(self._chrom,
+                                  self._src,
+                                  self._ft_type,
+                                  self._start,
+                                  self._end,
+                                  self._score,
+                                  self._strand,
+                                  self._frame,
+                                  tok,
+                                  sep)
+
+    def format_tab_single(self, attr_name, sep="\t"):
+        r"""Returns Feature as a string in tabulated format with a single
+        attribute (no intermediate list of values).
+
+        :param attr_name: the attribute name.
+        :param sep: separator.
+
+        :Example:
+
+        >>> from pygtftk.utils import get_example_feature
+        >>> from pygtftk.utils import TAB
+        >>> feat = get_example_feature()
+        >>> a = TAB.join(['chr1', 'Unknown', 'transcript', '100', '200', '.', '+', '.', 'NA'])
+        >>> assert feat.format_tab_single('foo') == a
+
+        """
+        val = self._get_attr(attr_name)
+        if not val:
+            val = 'NA'
+
+        return sep.join((self._chrom,
+                         self._src,
+                         self._ft_type,
+                         str(self._start),
+                         str(self._end),
+                         self._score,
+                         self._strand,
+                         self._frame,
+                         val))
 
     def write_bed(self,
                   name=None,
@@ -538,24 +896,19 @@ class Feature(object):
         if format not in ['bed6', 'bed', 'bed3']:
             raise GTFtkError('Unsupported bed format')
 
-        if pygtftk.utils.ADD_CHR == 1:
-            chrom_out = "chr" + self.chrom
-        else:
-            chrom_out = self.chrom
-
         # bed is 0-based (-1 on start)
-        token = [chrom_out,
-                 str(int(self.start) - 1),
-                 str(self.end)]
+        token = [self._chrom_out,
+                 str(self._start - 1),
+                 str(self._end)]
 
         if format == 'bed6' or format == 'bed':
             if name is None:
                 raise GTFtkError("Need a name (column 4) to write a BED6 format.")
             token += [name,
-                      str(self.score),
-                      self.strand]
+                      self._score,
+                      self._strand]
 
-        pygtftk.utils.write_properly('\t'.join(token), outputfile)
+        write_properly('\t'.join(token), outputfile)
 
     def write_gtf_to_bed6(self,
                           name=("transcript_id", "gene_id"),
@@ -592,15 +945,10 @@ class Feature(object):
         elif isinstance(name, str):
             name = [name]
 
-        if pygtftk.utils.ADD_CHR == 1:
-            chrom_out = "chr" + self.chrom
-        else:
-            chrom_out = self.chrom
-
         # bed is 0-based (-1 on start)
-        token = [chrom_out,
-                 str(int(self.start) - 1),
-                 str(self.end)]
+        token = [self._chrom_out,
+                 str(self._start - 1),
+                 str(self._end)]
 
         name_list = self.get_attr_value(attr_name=name,
                                         upon_none='set_na')
@@ -611,10 +959,10 @@ class Feature(object):
             name_out = sep.join(name_list)
 
         token += [name_out,
-                  str(self.score),
-                  self.strand]
+                  self._score,
+                  self._strand]
 
-        pygtftk.utils.write_properly('\t'.join(token), outputfile)
+        write_properly('\t'.join(token), outputfile)
 
     def write_bed_5p_end(self,
                          name=None,
@@ -646,23 +994,19 @@ class Feature(object):
         if format not in ['bed6', 'bed', 'bed3']:
             raise GTFtkError('Unsupported bed format')
 
-        if pygtftk.utils.ADD_CHR == 1:
-            chrom_out = "chr" + self.chrom
-        else:
-            chrom_out = self.chrom
-
-        token = [chrom_out,
-                 str(int(self.get_5p_end()) - 1),
-                 str(self.get_5p_end())]
+        pos = self.get_5p_end()
+        token = [self._chrom_out,
+                 str(pos - 1),
+                 str(pos)]
 
         if format == 'bed6' or format == 'bed':
             if name is None:
                 raise GTFtkError("Need a name (column 4) to write a BED6 format.")
             token += [name,
-                      str(self.score),
-                      self.strand]
+                      self._score,
+                      self._strand]
 
-        pygtftk.utils.write_properly('\t'.join(token), outputfile)
+        write_properly('\t'.join(token), outputfile)
 
     def write_bed_3p_end(self,
                          name=None,
@@ -691,24 +1035,20 @@ class Feature(object):
 
         """
 
-        if pygtftk.utils.ADD_CHR == 1:
-            chrom_out = "chr" + self.chrom
-        else:
-            chrom_out = self.chrom
-
         if format not in ['bed6', 'bed', 'bed3']:
             raise GTFtkError('Unsupported bed format')
 
-        token = [chrom_out,
-                 str(int(self.get_3p_end()) - 1),
-                 str(self.get_3p_end())]
+        pos = self.get_3p_end()
+        token = [self._chrom_out,
+                 str(pos - 1),
+                 str(pos)]
 
         if format == 'bed6' or format == 'bed':
             token += [name,
-                      str(self.score),
-                      self.strand]
+                      self._score,
+                      self._strand]
 
-        pygtftk.utils.write_properly('\t'.join(token), outputfile)
+        write_properly('\t'.join(token), outputfile)
 
     def add_attr(self, key, val):
         """Add an attribute to the Feature instance.
@@ -720,7 +1060,14 @@ class Feature(object):
         >>> feat.add_attr("foo", "bar")
         >>> assert feat.get_attr_value('foo') == ['bar']
         """
-        self.attr[key] = str(val)
+        self._ensure_attr()
+        self._attr_str = None
+        self._formatted = None
+        try:
+            self._vals[self._keys.index(key)] = str(val)
+        except ValueError:
+            self._keys.append(key)
+            self._vals.append(str(val))
 
     def add_attr_and_write(self, key, val, outputfile):
         """
@@ -739,25 +1086,18 @@ class Feature(object):
         >>> assert gtf.extract_data("foo", as_list=True) == ['bar']
         """
 
-        tok_list = list()
-
-        for key_cur, val_cur in list(self.attr.items()):
-            tok_list.append(''.join([key_cur, ' "', str(val_cur), '";']))
-
-        tok_list.append(''.join([key, ' "', str(val), '";']))
+        if self._attr_str is None:
+            self._ensure_attr()
+            self._attr_str = join_attr(self._keys, self._vals)
 
-        tok = ' '.join(tok_list)
-        token = [self.chrom,
-                 self.src,
-                 self.ft_type,
-                 str(self.start),
-                 str(self.end),
-                 str(self.score),
-                 self.strand,
-                 str(self.frame),
-                 tok]
+        if self._attr_str:
+            tok = f'{self._attr_str} {key} "{val}";'
+        else:
+            tok = f'{key} "{val}";'
 
-        write_properly('\t'.join(token), outputfile)
+        write_properly(f"{self._chrom}\t{self._src}\t{self._ft_type}\t{self._start}\t"
+                       f"{self._end}\t{self._score}\t{self._strand}\t{self._frame}\t{tok}",
+                       outputfile)
 
     def set_attr(self, key, val, upon_none='continue'):
         """Set an attribute value of the Feature instance.
@@ -776,8 +1116,11 @@ class Feature(object):
 
         val = str(val)
 
-        if key in self.attr:
-            self.attr[key] = str(val)
+        self._ensure_attr()
+        if key in self._keys:
+            self._attr_str = None
+            self._formatted = None
+            self._vals[self._keys.index(key)] = val
         elif key in ['chrom', 'seqname', 'seqid']:
             self.chrom = val
         elif key in ['feature', 'ft_type']:
@@ -847,7 +1190,7 @@ class Feature(object):
             elif i == 'frame':
                 val_cur = self.frame
             else:
-                val_cur = self.attr.get(i, None)
+                val_cur = self._get_attr(i)
                 if val_cur is None:
                     if upon_none == 'continue':
                         pass
@@ -877,4 +1220,83 @@ class Feature(object):
         >>> assert simple_line_count(tmp_file) == 1
         """
 
-        pygtftk.utils.write_properly(self.format(), file_out)
+        write_properly(self.format(), file_out)
+
+
+# ---------------------------------------------------------------
+# Classes FeatureWriter
+#
+# ---------------------------------------------------------------
+
+
+class FeatureWriter(object):
+    """A buffered output that can be passed to the write methods of Feature,
+    FieldSet and FastaSequence objects (as outputfile/file_out) in place of a
+    file object. Lines are accumulated and sent to the underlying file object
+    (or stdout if None) by chunks of about 'threshold' characters.
+    """
+
+    __slots__ = ('file_out', 'name', 'threshold', '_buffer', '_size')
+
+    def __init__(self, file_out=None, threshold=1 << 20):
+        """
+        :param file_out: The output file object (stdout if None or '-').
+        :param threshold: Flush the buffer when it exceeds this number of characters.
+
+        :Example:
+
+        >>> from pygtftk.Line import FeatureWriter
+        >>> from pygtftk.utils import get_example_feature
+        >>> from pygtftk.utils import make_tmp_file
+        >>> from pygtftk.utils import  simple_line_count
+        >>> feat = get_example_feature()
+        >>> tmp_file = make_tmp_file()
+        >>> with FeatureWriter(tmp_file) as out:
+        ...     for _ in range(10): feat.write(out)
+        >>> tmp_file.close()
+        >>> assert simple_line_count(tmp_file) == 10
+        >>> from io import StringIO
+        >>> a_str = StringIO()
+        >>> with FeatureWriter(a_str) as out:
+        ...     feat.write(out)
+        >>> assert a_str.getvalue().splitlines() == [feat.format()]
+
+        """
+        file_name = getattr(file_out, 'name', repr(file_out))
+
+        if file_out is None or file_name in ['<stdout>', '-']:
+            file_out = sys.stdout
+            file_name = file_out.name
+
+        self.file_out = file_out
+        self.name = 'FeatureWriter(' + str(file_name) + ')'
+        self.threshold = threshold
+        self._buffer = []
+        self._size = 0
+
+    def write(self, a_string):
+        """Add a string to the buffer.
+
+        :param a_string: a character string.
+        """
+        self._buffer.append(a_string)
+        self._size += len(a_string)
+        if self._size > self.threshold:
+            self.flush()
+
+    def flush(self):
+        """Write the buffer content to the underlying file object."""
+        if self._buffer:
+            self.file_out.write(''.join(self._buffer))
+            self._buffer = []
+            self._size = 0
+
+    def close(self):
+        """Flush the buffer. The underlying file object is left open."""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
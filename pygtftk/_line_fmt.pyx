@@ -0,0 +1,51 @@
+"""
+Cython functions used by pygtftk.Line to serialize Feature objects (i.e GTF
+lines). These are the per-record hot spots when writing large GTF files.
+A pure Python fallback is provided by pygtftk.Line if this module is not
+compiled.
+"""
+
+cimport cython
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef str join_attr(list keys, list vals):
+    """Returns the attributes as a GTF last column (key "value"; ...).
+
+    :param keys: The attribute names.
+    :param vals: The attribute values.
+
+    :Example:
+
+    >>> from pygtftk._line_fmt import join_attr
+    >>> assert join_attr(['gene_id', 'transcript_id'], ['g1', 'g1t1']) == 'gene_id "g1"; transcript_id "g1t1";'
+    """
+    cdef Py_ssize_t i
+    cdef Py_ssize_t n = len(keys)
+    cdef list tok = [None] * n
+
+    for i in range(n):
+        tok[i] = keys[i] + ' "' + vals[i] + '";'
+
+    return ' '.join(tok)
+
+
+cpdef str format_feature_tab(chrom, src, ft_type, start, end, score, strand,
+                             frame, list values, str sep):
+    """Returns the 8 first columns of a Feature followed by a set of values.
+
+    :Example:
+
+    >>> from pygtftk._line_fmt import format_feature_tab
+    >>> a = format_feature_tab('chr1', 'src', 'exon', 1, 10, '.', '+', '.', ['g1'], '\\t')
+    >>> assert a == 'chr1\\tsrc\\texon\\t1\\t10\\t.\\t+\\t.\\tg1'
+    """
+    return sep.join([chrom,
+                     src,
+                     ft_type,
+                     str(start),
+                     str(end),
+                     score,
+                     strand,
+                     frame] + values)
@@ -357,12 +357,14 @@ class FormattedFile(argparse.FileType):
     :param mode: the mode ('r'...).
     :param mode: A string or tuple, The accepted file_ext  ('bed', 'bed.gz', 'txt', 'txt.gz', 'gtf', 'gtf.gz', 'fasta',
     'fasta.gz', 'zip', 'bigwig')
+    :param path_only: return the checked path (str) instead of an opened file.
 
     """
 
-    def __init__(self, mode='r', file_ext='bed', **kwargs):
+    def __init__(self, mode='r', file_ext='bed', path_only=False, **kwargs):
         super(FormattedFile, self).__init__(mode, **kwargs)
         self.file_ext = file_ext
+        self.path_only = path_only
 
     def __call__(self, string):
 
@@ -504,6 +506,11 @@ class FormattedFile(argparse.FileType):
         if 'w' in self._mode:
             self._mode = 'w'
 
+        if self.path_only:
+            if 'r' in self._mode and not os.path.isfile(string):
+                raise argparse.ArgumentTypeError("can't open '%s'" % string)
+            return string
+
         return super(FormattedFile, self).__call__(string)
 
 
@@ -1,13 +1,23 @@
+import hashlib
+import os
 import re
 import textwrap
+import time
 import xml.etree.ElementTree as ElementTree
 from collections import defaultdict
 
 import requests
 from requests.exceptions import ConnectionError as ConErr
 
+import pygtftk.utils
 from pygtftk.utils import message
 
+# Lists of databases/datasets are kept on disk for this number of seconds.
+BIOMART_CACHE_TTL = 7 * 24 * 3600
+
+# Set this environment variable to disable the on-disk cache.
+BIOMART_NO_CACHE_ENV = "GTFTK_NO_BIOMART_CACHE"
+
 
 class Biomart(object):
 
@@ -15,18 +25,21 @@ class Biomart(object):
                  xml=None,
                  url="http://www.ensembl.org/biomart/martservice?",
                  http_proxy='',
-                 https_proxy=''):
+                 https_proxy='',
+                 cache=True):
         """A connection to a Mart server.
 
         :param url: The full url to the mart server.
         :param xml: A string/docstring containing the query.
         :param http_proxy:
+        :param cache: Keep the lists of databases/datasets on disk (see _cached_query()).
 
         """
 
         self.url = url
         self.xml = xml
         self.proxies = {'http': http_proxy, 'https': https_proxy}
+        self.cache = cache and not os.environ.get(BIOMART_NO_CACHE_ENV)
         self.databases = []
         self.datasets = defaultdict(list)
         self._get_databases()
@@ -59,11 +72,11 @@ class Biomart(object):
 
         message("Listing available databases", type="DEBUG")
         try:
-            self.query(query={'type': 'registry'})
+            content = self._cached_query(query={'type': 'registry'})
         except ConErr:
             message("Raised a connection Error.", type="ERROR")
 
-        tree = ElementTree.fromstring(self.response.content)
+        tree = ElementTree.fromstring(content)
 
         for child in tree:
             if child.tag == 'MartURLLocation':
@@ -73,19 +86,72 @@ class Biomart(object):
         message("Listing available datasets", type="DEBUG")
         if database in self.databases:
 
-            self.query(query={'type': 'datasets', 'mart': database})
-            for i in self.response.text.split("\n"):
+            content = self._cached_query(query={'type': 'datasets', 'mart': database})
+            for i in content.decode().split("\n"):
                 fields = i.split("\t")
                 if len(fields) > 1:
                     self.datasets[fields[1]] = fields[2:]
         else:
             message("Database not found.")
 
-    def query(self, query):
+    def _cached_query(self, query):
+        """Returns the content (bytes) of a query whose result rarely changes
+        (list of databases/datasets). The content is stored in the 'biomart'
+        directory of the temporary directory (if set, see --tmp-dir) or of
+        ~/.gtftk and reused during BIOMART_CACHE_TTL seconds. The cache is
+        not used if self.cache is False or if the GTFTK_NO_BIOMART_CACHE
+        environment variable is set.
+
+        :param query: The query (a dict).
+        """
+
+        if not self.cache:
+            self.query(query)
+            return self.response.content
+
+        if pygtftk.utils.TMP_DIR is not None:
+            cache_dir = os.path.join(pygtftk.utils.TMP_DIR, "biomart")
+        else:
+            cache_dir = os.path.join(os.path.expanduser("~"), ".gtftk", "biomart")
+
+        key = self.url + str(sorted(query.items()))
+        cache_file = os.path.join(cache_dir, hashlib.md5(key.encode()).hexdigest())
+
+        try:
+            if time.time() - os.path.getmtime(cache_file) < BIOMART_CACHE_TTL:
+                message("Using cached Biomart response " + cache_file, type="DEBUG")
+                with open(cache_file, "rb") as cache_handle:
+                    return cache_handle.read()
+        except OSError:
+            pass
+
+        self.query(query)
+        content = self.response.content
+
+        # The cache is only an optimization. Write errors are not fatal.
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = cache_file + "." + str(os.getpid())
+            with open(tmp_file, "wb") as cache_handle:
+                cache_handle.write(content)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            message("Could not write Biomart cache file " + cache_file, type="DEBUG")
+
+        return content
+
+    def query(self, query, stream=False):
+        """Send a query to the server.
+
+        :param query: The query (a dict).
+        :param stream: Do not download the response content now. It should
+         then be read line by line with iter_lines().
+        """
         message("Sending query", type="DEBUG")
         self.response = requests.get(self.url,
                                      query,
-                                     proxies=self.proxies)
+                                     proxies=self.proxies,
+                                     stream=stream)
 
         message("Checking http response", type="DEBUG")
 
@@ -95,12 +161,26 @@ class Biomart(object):
                              m=self.response.reason)
             message(msg, type="ERROR")
 
+        if not stream:
+            self._check_downtime(self.response.text)
+
+    def iter_lines(self):
+        """Iterate over the lines of the last response (decoded) without
+        loading the whole content in memory."""
+
+        self.response.encoding = 'utf-8'
+
+        for line in self.response.iter_lines(decode_unicode=True):
+            self._check_downtime(line)
+            yield line
+
+    def _check_downtime(self, text):
+
         msg = "([ \.\w]+ service you requested is currently unavailable[ \.\w]+)"
-        hit = re.search(msg, self.response.text)
+        hit = re.search(msg, text)
 
         if hit:
-            msg = re.search(msg, self.response.text).group(1)
-            message(msg.lstrip().rstrip(), type="WARNING")
+            message(hit.group(1).lstrip().rstrip(), type="WARNING")
             message("More information about this downtime "
                     "may be available on http://www.ensembl.info/",
                     type="ERROR")
@@ -237,9 +237,11 @@ class FASTA(object):
                 yield tx.header, feat_list, seq_list
             else:
                 yield tx.header, seq_list
+    """
 
     def as_dict(self, feat="exon"):
-        Iterate feature wise
+        """Returns the sequences of a feature type as a dict. Keys are (gene_id,
+        transcript_id, chrom, start, end, strand, feature) tuples.
 
         :param feat: The feature type (exon, CDS).
 
@@ -265,12 +267,12 @@ class FASTA(object):
         >>> assert a_dict[('G0004', 'G0004T002', 'chr1', 74, 75, '+', 'CDS')] == 'gc'
         >>> assert a_dict[('G0006', 'G0006T001', 'chr1', 22, 25, '-', 'CDS')] == 'acat'
         >>> assert a_dict[('G0006', 'G0006T001', 'chr1', 28, 30, '-', 'CDS')]  == 'att'
-        
+        """
 
-        d_out = OrderedDict()
+        d_out = dict()
 
         if not self.intron:
-            GTFtkError("Can't iter_features() if self.intron is False.")
+            raise GTFtkError("Can't use as_dict() if self.intron is False.")
 
         for i in range(self._data.nb):
             b = self._data.sequence[i]
@@ -311,7 +313,6 @@ class FASTA(object):
                            b.strand.decode(),
                            name)] = seq[s:e + 1]
         return d_out
-    """
 
     def __getitem__(self, x=None):
         if 0 <= x < self._data.nb:
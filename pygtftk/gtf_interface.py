@@ -18,6 +18,7 @@ import sys
 import textwrap
 from collections import OrderedDict
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 from cffi import FFI
@@ -38,6 +39,7 @@ from pyparsing import opAssoc
 import pygtftk
 import pygtftk.utils
 from pygtftk.Line import Feature
+from pygtftk.Line import FeatureWriter
 from pygtftk.fasta_interface import FASTA
 from pygtftk.tab_interface import TAB
 from pygtftk.utils import GTFtkError
@@ -59,6 +61,43 @@ def native_str(x):
     return bytes(x.encode())
 
 
+def read_join_matrix(join_file):
+    """Read a matrix file (row names as target keys, column names as novel
+    keys). Returns a dict (novel key -> dict (target key -> list of values)).
+    Keys are kept in file order.
+
+    :param join_file: The path to the matrix file.
+    """
+    id_to_val = defaultdict(lambda: defaultdict(list))
+
+    with open(join_file, "r") as join_fh:
+        for line_nb, line in enumerate(join_fh):
+
+            line = chomp(line)
+
+            if line_nb == 0:
+                tokens = line.split("\t")
+
+                if len(tokens) < 2:
+                    raise GTFtkError(
+                        "Found less than 2 columns. Is the file tabulated ?")
+                key_names = tokens[1:]
+            else:
+                token = line.split("\t")
+
+                if len(token) < 2:
+                    raise GTFtkError(
+                        "Unable to split the line. Is the file tabulated ?")
+                if len(token[1:]) != len(key_names):
+                    raise GTFtkError(
+                        "The number of columns differ from the header")
+
+                for key_name, val in zip(key_names, token[1:]):
+                    id_to_val[key_name][token[0]].append(val)
+
+    return id_to_val
+
+
 # ---------------------------------------------------------------
 # find module path
 # ---------------------------------------------------------------
@@ -398,6 +437,7 @@ TTEXT *get_attribute_values_list(GTF_DATA *gtf_data, char *attribute);
 int get_type(GTF_DATA *gtf_data, char *key, int ignore_undef);
 GTF_DATA *convert_to_ensembl(GTF_DATA *gtf_data);
 GTF_DATA *add_attributes(GTF_DATA *gtf_data, char *features, char *key, char *new_key, char *inputfile_name);
+GTF_DATA *add_attributes_multi(GTF_DATA *gtf_data, char *features, char *key, char *inputfile_name);
 GTF_DATA *del_attributes(GTF_DATA *gtf_data, char *features, char *keys);
 GTF_DATA *select_by_positions(GTF_DATA *gtf_data, int *pos, int size);
 GTF_DATA *add_exon_number(GTF_DATA *gtf_data, char *exon_number_field);
@@ -409,6 +449,9 @@ void clear_indexes(void);
 GTF_DATA *add_attr_column(GTF_DATA *gtf_data, char *inputfile_name, char *new_key);
 int int_array_test(int *pos, int size);
 void *print_bed(GTF_DATA *gtf_data, char *output, int add_chr, char *keys, char *sep, char *more_info);
+char *get_rows_block(GTF_DATA *gtf_data, int from, int to, int *size);
+char *get_raw_rows_block(RAW_DATA *raw_data, int from, int to, int *size);
+char *get_raw_lines_block(RAW_DATA *raw_data, int from, int to, char *sep, char *skip, int *size);
 
 """)
 
@@ -418,6 +461,9 @@ void *print_bed(GTF_DATA *gtf_data, char *output, int add_chr, char *keys, char
 
 MAX_REPR_LINE = 6
 
+# The number of rows retrieved from libgtftk at once when iterating
+ITER_BLOCK_SIZE = 10000
+
 
 class GTF(object):
     """An interface to a GTF file. This object returns a GTF, TAB
@@ -1001,10 +1047,78 @@ class GTF(object):
         """
         message("Interating over GTF instance.", type="DEBUG")
 
-        for i in range(self._data.size):
-            feat = Feature(ptr=self._data.data[i])
+        # Rows are serialized by libgtftk block by block so that
+        # a single call (and a single decoding) is needed per block.
+        # The next block is prepared in a separate thread (cffi releases
+        # the GIL during the call) while Features of the current one are
+        # being created and consumed. No thread is used for a single block.
+        bounds = [(first, min(first + ITER_BLOCK_SIZE, self._data.size))
+                  for first in range(0, self._data.size, ITER_BLOCK_SIZE)]
+
+        if not bounds:
+            return
+
+        if len(bounds) == 1:
+            first, last = bounds[0]
+            yield from self._features_from_block(self._get_rows_block(first, last),
+                                                 last - first)
+            return
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self._get_rows_block, *bounds[0])
+
+            for k, (first, last) in enumerate(bounds):
+                raw = future.result()
+                if k + 1 < len(bounds):
+                    future = executor.submit(self._get_rows_block, *bounds[k + 1])
+
+                yield from self._features_from_block(raw, last - first)
+
+    @staticmethod
+    def _features_from_block(raw, nb_rows):
+        """Yield the Features of a block returned by _get_rows_block().
+
+        :param raw: The block of rows.
+        :param nb_rows: The number of rows in the block.
+        """
+
+        tok = raw.split('\0')
+        pos = 0
+        for _ in range(nb_rows):
+            feat = Feature._from_batch(tok, pos)
+            pos += 10 + 2 * feat.nb_key
             yield feat
 
+    def _get_rows_block(self, first, last):
+        """Get rows [first, last[ serialized as a string of NUL separated
+        tokens (see Feature._from_batch()). The string is decoded directly
+        from the C buffer (no intermediate bytes object).
+
+        :param first: The first row.
+        :param last: The row following the last one.
+
+        :Example:
+
+        >>> from  pygtftk.utils import get_example_file
+        >>> from pygtftk.gtf_interface import GTF
+        >>> a_gtf = GTF(get_example_file()[0])
+        >>> feats = list(a_gtf)
+        >>> tok = a_gtf._get_rows_block(0, 1).split('\\0')
+        >>> assert tok[:10] == ['0', '1', 'chr1', 'gtftk', 'gene', '125', '138', '.', '+', '.']
+        >>> assert tok[10:12] == ['gene_id', 'G0001']
+        >>> block = list(GTF._features_from_block(a_gtf._get_rows_block(5, 12), 7))
+        >>> assert [x.rank for x in block] == list(range(5, 12))
+        >>> assert [x.format() for x in block] == [x.format() for x in feats[5:12]]
+        >>> assert a_gtf._get_rows_block(3, 3) == ''
+        """
+
+        size = ffi.new("int *")
+        block = self._dll.get_rows_block(self._data, first, last, size)
+        raw = str(ffi.buffer(block, size[0]), 'utf-8')
+        self._dll.free_mem(block)
+
+        return raw
+
     def __getitem__(self, x=None):
         """ The indexing function. May accept a tuple (key, val), an integer or a list of integers
         (indexing is zero-based) or a numpy array with boolean (numpy.bool_) indicating which lines (those 'True') are
@@ -1211,6 +1325,9 @@ class GTF(object):
         >>> assert len(a_gtf.select_by_key("feature", "transcript").extract_data("seqid", as_dict=True)) == 1
         >>> assert [len(x) for x in a_gtf.select_by_key("feature", "transcript").extract_data("seqid,start", as_list_of_list=True)].count(2) == 15
         >>> assert len(a_gtf.select_by_key("feature", "transcript").extract_data("seqid,start", as_list_of_list=True, nr=True)) == 11
+        >>> a_tab = a_gtf.extract_data("feature,gene_id", nr=True)
+        >>> assert len(a_tab) == 40
+        >>> assert [list(x) for x in a_tab][:3] == [['gene', 'G0001'], ['transcript', 'G0001'], ['exon', 'G0001']]
         """
 
         if keys is None:
@@ -1596,10 +1713,10 @@ class GTF(object):
         >>> a_gtf = GTF(a_file)
         >>> a_gtf = a_gtf.add_prefix(feat="transcript", key="gene_id", suffix=False, txt="bla")
         >>> a_list = a_gtf.select_by_key("feature", "transcript").extract_data("gene_id", as_list=True, nr=True)
-        >>> assert all([x.startswith('bla') for x in a_list])
+        >>> assert all(x.startswith('bla') for x in a_list)
         >>> a_gtf = a_gtf.add_prefix(feat="transcript", key="gene_id", suffix=True, txt="bla")
         >>> a_list = a_gtf.select_by_key("feature", "transcript").extract_data("gene_id", as_list=True, nr=True)
-        >>> assert all([x.endswith('bla') for x in a_list])
+        >>> assert all(x.endswith('bla') for x in a_list)
         """
 
         if suffix:
@@ -1626,7 +1743,7 @@ class GTF(object):
         feature type.
 
         :param key: The key/attribute name to use for selection.
-        :param value: Value for that key/attribute.
+        :param value: Value for that key/attribute. Either a comma-separated string or an iterable (list, tuple, set) of values.
         :param invert_match: Boolean. Select lines that do not match that key and value.
         :param file_with_values: A file containing values (one column).
         :param col: The column number (one-based) that contains the values in the file.
@@ -1647,6 +1764,7 @@ class GTF(object):
         >>> b_gtf = a_gtf.select_by_key("feature", "gene")
         >>> assert len(b_gtf) == 10
         >>> assert len(a_gtf.select_by_key("feature", "exon")) == 25
+        >>> assert len(a_gtf.select_by_key("gene_id", ["G0004", "G0005"])) == len(a_gtf.select_by_key("gene_id", "G0004,G0005"))
         """
 
         if no_na:
@@ -1662,7 +1780,10 @@ class GTF(object):
         if value is not None and file_with_values is not None:
             raise GTFtkError("Please choose between 'value' and 'file_with_values' argument.")
 
-        if invert_match and value is not None:
+        if isinstance(value, (list, tuple, set, frozenset)):
+            # Values are joined once, without being re-split below
+            value = ",".join(value)
+        elif invert_match and value is not None:
             value = ",".join(list(set(value.split(','))))
 
         key = str(key)
@@ -2092,7 +2213,7 @@ class GTF(object):
         pos = 0
 
         for i in tab:
-            if not any([True if x in na_omit else False for x in i]):
+            if not any(x in na_omit for x in i):
                 try:
                     [float(x) for x in i]
                     if eval(parsed_exp_str):
@@ -2312,7 +2433,7 @@ class GTF(object):
 
         :param feat: The comma-separated list of target features. If None, all the features.
         :param key: The name of the key to use for joining (i.e the key corresponding to value provided in the file).
-        :param inputfile: A two column (e.g transcript_id and new value) file.
+        :param inputfile: A matrix file or a list of matrix files. The keys of all files are added in a single pass. If several files (or the GTF) provide the same key, the value from the last file is kept.
 
         :Example:
 
@@ -2325,6 +2446,25 @@ class GTF(object):
         >>> assert b_gtf.extract_data("S1",as_list=True, no_na=True, hide_undef=True) == ['0.2322', '0.999', '0.5555']
         >>> assert b_gtf.extract_data("S2",as_list=True, no_na=True, hide_undef=True) == ['0.4', '0.6', '0.7']
         >>> assert b_gtf.del_attr(keys='S1,S2').get_attr_list() == ['gene_id', 'transcript_id', 'exon_id', 'ccds_id']
+        >>> join_file_2 = get_example_file("simple", "join_mat_2")[0]
+        >>> c_gtf = a_gtf.add_attr_from_matrix_file(feat="gene", key="gene_id", inputfile=[join_file, join_file_2])
+        >>> assert c_gtf.extract_data("S3",as_list=True, no_na=True, hide_undef=True) == ['A', 'C', 'E']
+        >>> assert c_gtf.select_by_key("gene_id", "G0004").select_by_key("feature", "gene").get_attr_list() == ['gene_id', 'S1', 'S2', 'S3', 'S4']
+        >>> assert c_gtf.select_by_key("gene_id", "G0001").get_attr_list() == a_gtf.select_by_key("gene_id", "G0001").get_attr_list()
+        >>> assert c_gtf.select_by_key("feature", "transcript").extract_data("S3", as_list=True, no_na=True, hide_undef=True) == []
+        >>> from pygtftk.utils import make_tmp_file
+        >>> join_file_3 = make_tmp_file(suffix=".txt")
+        >>> _ = join_file_3.write("genes\\tS5\\nG9999\\tX\\nG0002\\tY\\n")
+        >>> join_file_3.close()
+        >>> d_gtf = a_gtf.add_attr_from_matrix_file(feat="gene,transcript", key="gene_id", inputfile=join_file_3.name)
+        >>> assert d_gtf.extract_data("S5",as_list=True, no_na=True, hide_undef=True) == ['Y', 'Y']
+        >>> join_file_4 = make_tmp_file(suffix=".txt")
+        >>> _ = join_file_4.write("genes\\tS2\\tS1\\nG0003\\tZ\\t1\\nG0005\\tW\\t2\\n")
+        >>> join_file_4.close()
+        >>> e_gtf = a_gtf.add_attr_from_matrix_file(feat="gene", key="gene_id", inputfile=[join_file, join_file_4.name]).select_by_key("feature", "gene")
+        >>> assert e_gtf.select_by_key("gene_id", "G0003").extract_data("S1,S2", as_list_of_list=True) == [['1', 'Z']]
+        >>> assert e_gtf.select_by_key("gene_id", "G0004").extract_data("S1,S2", as_list_of_list=True) == [['0.999', '0.6']]
+        >>> assert [i.format() for i in e_gtf.select_by_key("gene_id", "G0003,G0005")] == ['chr1\\tgtftk\\tgene\\t50\\t61\\t.\\t-\\t.\\tgene_id "G0003"; S1 "1"; S2 "Z";', 'chr1\\tgtftk\\tgene\\t33\\t47\\t.\\t-\\t.\\tgene_id "G0005"; S2 "W"; S1 "2";']
 
         """
 
@@ -2336,59 +2476,29 @@ class GTF(object):
         if inputfile is None:
             raise GTFtkError("Need an input/join file.")
 
-        if isinstance(inputfile, io.IOBase):
-            inputfile = inputfile.name
-
-        id_to_val = defaultdict(lambda: defaultdict(list))
-
-        for line_nb, line in enumerate(open(inputfile, "r")):
-
-            line = chomp(line)
-
-            if line_nb == 0:
-                tokens = line.split("\t")
-
-                if len(tokens) < 2:
-                    raise GTFtkError(
-                        "Found less than 2 columns. Is the file tabulated ?")
-                key_names = tokens[1:]
-            else:
-                token = line.split("\t")
+        if isinstance(inputfile, (str, io.IOBase)):
+            inputfile = [inputfile]
 
-                if len(token) < 2:
-                    raise GTFtkError(
-                        "Unable to split the line. Is the file tabulated ?")
-                if len(token[1:]) != len(key_names):
-                    raise GTFtkError(
-                        "The number of columns differ from the header")
+        inputfile = [x.name if isinstance(x, io.IOBase) else x for x in inputfile]
 
-                for i in range(len(key_names)):
-                    id_to_val[key_names[i]][token[0]] += [token[i + 1]]
+        matrices = [read_join_matrix(x) for x in inputfile]
 
-        for i in range(len(key_names)):
-            message("Adding key " + key_names[i], type="DEBUG")
-            tmp_file = make_tmp_file(prefix="add_attr_" + re.sub('[\W]+',
-                                                                 '',
-                                                                 key_names[i]),
-                                     suffix=".txt")
-            for k, v in list(id_to_val[key_names[i]].items()):
-                tmp_file.write(k + "\t" + "|".join(v) + "\n")
+        # Write a single (key value, new key, new value) file
+        # for all matrices.
+        tmp_file = make_tmp_file(prefix="add_attr_matrix", suffix=".txt")
 
-            tmp_file.close()
+        for id_to_val in matrices:
+            for key_name in id_to_val:
+                message("Adding key " + key_name, type="DEBUG")
+                for k, v in id_to_val[key_name].items():
+                    tmp_file.write(k + "\t" + key_name + "\t" + "|".join(v) + "\n")
 
-            if i == 0:
-                new_data = self._dll.add_attributes(self._data,
-                                                    native_str(feat),
-                                                    native_str(key),
-                                                    native_str(key_names[i]),
-                                                    native_str(tmp_file.name))
+        tmp_file.close()
 
-            else:
-                new_data = self._dll.add_attributes(new_data,
-                                                    native_str(feat),
-                                                    native_str(key),
-                                                    native_str(key_names[i]),
-                                                    native_str(tmp_file.name))
+        new_data = self._dll.add_attributes_multi(self._data,
+                                                  native_str(feat),
+                                                  native_str(key),
+                                                  native_str(tmp_file.name))
 
         return self._clone(new_data)
 
@@ -2950,6 +3060,7 @@ class GTF(object):
         message("Calling 'get_5p_end'.", type="DEBUG")
 
         tx_bed = make_tmp_file("TSS", ".bed")
+        tx_bed_out = FeatureWriter(tx_bed)
 
         for i in self.select_by_key("feature", feat_type):
             name_list = i.get_attr_value(attr_name=name,
@@ -2971,7 +3082,8 @@ class GTF(object):
             name_out = sep.join(name_out)
 
             i.write_bed_5p_end(name=name_out,
-                               outputfile=tx_bed)
+                               outputfile=tx_bed_out)
+        tx_bed_out.close()
         tx_bed.close()
 
         bed_obj = BedTool(tx_bed.name)
@@ -3088,6 +3200,7 @@ class GTF(object):
             name = list(name)
 
         tx_bed = make_tmp_file("TTS", ".bed")
+        tx_bed_out = FeatureWriter(tx_bed)
 
         for i in self.select_by_key("feature", feat_type):
             name_list = i.get_attr_value(attr_name=name,
@@ -3105,7 +3218,8 @@ class GTF(object):
 
             name_out = sep.join(name_out)
             i.write_bed_3p_end(name=name_out,
-                               outputfile=tx_bed)
+                               outputfile=tx_bed_out)
+        tx_bed_out.close()
         tx_bed.close()
 
         bed_obj = BedTool(tx_bed.name)
@@ -3636,7 +3750,7 @@ class GTF(object):
         message("Calling 'get_chroms'.", type="DEBUG")
 
         if as_dict:
-            alist = OrderedDict()
+            alist = dict()
             ptr = self._dll.get_seqid_list(self._data)
             for i in range(ptr.size):
                 key = ffi.string(ptr.data[i][1].decode())
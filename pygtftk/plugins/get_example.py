@@ -3,16 +3,16 @@
  Print example files including GTF.
 """
 import argparse
-import glob
+import io
 import os
 import shutil
 import sys
 
 import gc
+from functools import lru_cache
 
 import pygtftk
 from pygtftk.cmd_object import CmdObject
-from pygtftk.gtf_interface import GTF
 from pygtftk.utils import close_properly
 from pygtftk.utils import get_example_file
 from pygtftk.utils import message
@@ -88,6 +88,51 @@ def make_parser():
     return parser
 
 
+# The directory containing the datasets
+_DATA_ROOT = os.path.join(pygtftk.__path__[0], "data")
+
+
+@lru_cache(maxsize=64)
+def _list_dataset(dataset):
+    """Returns the (name, path, size) of the entries of a dataset directory
+    (size is None if the entry is not a regular file)."""
+    with os.scandir(os.path.join(_DATA_ROOT, dataset)) as entries:
+        return tuple((i.name, i.path, i.stat().st_size if i.is_file() else None)
+                     for i in entries)
+
+
+@lru_cache(maxsize=64)
+def _find_example(dataset, exts=("gtf", "gtf.gz")):
+    """Returns the first example file of a dataset with one of the
+    extensions (tried in order) or None."""
+    for ext in exts:
+        file_path = get_example_file(datasetname=dataset, ext=ext)
+        if file_path:
+            return file_path[0]
+    return None
+
+
+def _copy_files(files, quiet=False):
+    """Copy a set of (name, path, size) files to the current directory
+    (existing files are not overwritten)."""
+    copied = []
+    canceled = []
+    for name, path, _ in files:
+        if "__" in name:
+            continue
+        if not os.path.exists(name):
+            shutil.copy(path, name)
+            copied += [name]
+        else:
+            canceled += [name]
+
+    if not quiet:
+        if copied:
+            message("Copied files : " + ", ".join(copied), force=True)
+        if canceled:
+            message("Copy canceled, files already exist: " + ", ".join(canceled), force=True)
+
+
 def get_example(outputfile=None,
                 dataset=None,
                 format="gtf",
@@ -102,91 +147,65 @@ def get_example(outputfile=None,
 
     if all_dataset:
         message("The following datasets were found:")
-        path_dataset = os.path.join(pygtftk.__path__[0],
-                                    "data")
-        dataset_list = glob.glob(os.path.join(path_dataset, "*"))
-        dataset_list = [x for x in dataset_list if "__init__" not in x]
-        for i in dataset_list:
-            print("\t- " + os.path.basename(i))
+        with os.scandir(_DATA_ROOT) as entries:
+            for i in entries:
+                if i.is_dir() and i.name not in {"__init__.py", "__pycache__"}:
+                    print("\t- " + i.name)
 
     elif list:
 
-        path_dataset = os.path.join(pygtftk.__path__[0],
-                                    "data",
-                                    dataset)
-
-        file_dataset = os.listdir(path_dataset)
-
-        for i in file_dataset:
-            print("\t" + i)
+        for name, _, _ in _list_dataset(dataset):
+            print("\t" + name)
     else:
         if format == "gtf":
-            example_file = get_example_file(datasetname=dataset,
-                                            ext=format)
-
-            if example_file:
-                example_file = example_file[0]
-            else:
-                example_file = get_example_file(datasetname=dataset,
-                                                ext=format + ".gz")
-                if example_file:
-                    example_file = example_file[0]
-                else:
-                    message("No GTF file found for this dataset.",
-                            type="ERROR")
+            # Imported here as loading the plugin does not require libgtftk
+            from pygtftk.gtf_interface import GTF
+
+            example_file = _find_example(dataset)
+
+            if example_file is None:
+                message("No GTF file found for this dataset.",
+                        type="ERROR")
             GTF(example_file, check_ensembl_format=False).write(outputfile, gc_off=True)
 
         elif format in ["fa", "join", "join_mat", "genome", "chromInfo", "genes", "geneList"]:
             try:
                 infile = open(get_example_file(datasetname=dataset,
-                                               ext=format)[0], "r")
-            except:
+                                               ext=format)[0], "rb")
+            except (IndexError, OSError):
                 message("Unable to find example file.", type="ERROR")
 
-            for line in infile:
-                outputfile.write(line)
+            # Copy by chunks of 1Mb to the underlying binary stream
+            # (or as text if outputfile has none, e.g. StringIO).
+            outputfile.flush()
+            with infile:
+                if hasattr(outputfile, "buffer"):
+                    shutil.copyfileobj(infile, outputfile.buffer, 1 << 20)
+                else:
+                    shutil.copyfileobj(io.TextIOWrapper(infile), outputfile, 1 << 20)
 
         elif format == "*":
 
-            file_path = glob.glob(os.path.join(pygtftk.__path__[0],
-                                               'data',
-                                               dataset,
-                                               "*"))
-            file_path = [x for x in file_path if "__" not in x]
-            target_path = os.path.join(pygtftk.__path__[0], 'data', dataset)
+            target_path = os.path.join(_DATA_ROOT, dataset)
             if not quiet:
                 message("Copying from :" + target_path)
 
-            for i in file_path:
-                if not os.path.exists(os.path.join(os.getcwd(), os.path.basename(i))):
-                    if not quiet:
-                        message("Copying file : " + os.path.basename(i), force=True)
-                    shutil.copy(i, ".")
-                else:
-                    if not quiet:
-                        message("Copy canceled, file already exist: " + os.path.basename(i), force=True)
+            _copy_files([i for i in _list_dataset(dataset) if i[2] is not None],
+                        quiet=quiet)
 
         else:
 
-            file_path = glob.glob(os.path.join(pygtftk.__path__[0],
-                                               'data',
-                                               dataset,
-                                               "*" + '.' + format))
+            suffix = '.' + format
+            target_path = os.path.join(_DATA_ROOT, dataset)
+            file_path = [i for i in _list_dataset(dataset)
+                         if i[0].endswith(suffix) and i[2] is not None]
+
             if not file_path:
                 message("No corresponding file found", type='ERROR')
 
-            file_path = [x for x in file_path if "__" not in x]
-            target_path = os.path.join(pygtftk.__path__[0], 'data', dataset)
             message("Copying from :" + target_path)
 
-            for i in file_path:
-                if not os.path.exists(os.path.join(os.getcwd(), os.path.basename(i))):
-                    if not quiet:
-                        message("Copying file : " + os.path.basename(i), force=True)
-                    shutil.copy(i, ".")
-                else:
-                    if not quiet:
-                        message("Copy canceled, file already exist:" + os.path.basename(i), force=True)
+            _copy_files(file_path, quiet=quiet)
     gc.disable()
     close_properly(outputfile)
 
@@ -105,6 +105,10 @@ def make_parser():
                             type=str,
                             required=False)
 
+    parser_grp.add_argument('-nc', '--no-cache',
+                            help='Do not use the cached lists of Biomart databases/datasets.',
+                            action="store_true")
+
     return parser
 
 
@@ -138,7 +142,8 @@ def great_reg_domains(inputfile=None,
                       distal=1000000,
                       mode='basal_plus_extension',
                       http_proxy=None,
-                      https_proxy=None):
+                      https_proxy=None,
+                      no_cache=False):
     """ Given a GTF and a GO term, attempt compute labeled regions using GREAT 'association rule'. """
 
     # -------------------------------------------------------------------------
@@ -319,7 +324,8 @@ def great_reg_domains(inputfile=None,
         is_associated = set()
 
         bm = Biomart(http_proxy=http_proxy,
-                     https_proxy=https_proxy)
+                     https_proxy=https_proxy,
+                     cache=not no_cache)
 
         bm.get_datasets('ENSEMBL_MART_ENSEMBL')
 
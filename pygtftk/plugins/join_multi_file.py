@@ -94,10 +94,10 @@ def join_multi_file(
     #  Do it
     # -----------------------------------------------------------
 
-    for join_file in matrix_files:
-        gtf = gtf.add_attr_from_matrix_file(feat=target_feature,
-                                            key=key_to_join,
-                                            inputfile=join_file.name)
+    # All matrix files are added in a single pass
+    gtf = gtf.add_attr_from_matrix_file(feat=target_feature,
+                                        key=key_to_join,
+                                        inputfile=[x.name for x in matrix_files])
     gtf.write(outputfile,
               gc_off=True)
 
@@ -136,6 +136,18 @@ else:
      result=`gtftk join_multi_file -i simple.gtf -k gene_id  -t gene  -V 2 -m simple.join_mat simple.join_mat_2 simple.join_mat_3 | gtftk select_by_regexp  -k S5 -r "\d+"| gtftk tabulate -Hun -k S5,S6| perl -npe 's/\\t/_/g; s/\\n/;/'`
       [ "$result" = "0.2322_0.4;0.999|0.999_0.6|0.6;0.5555|20_0.7|30;" ]
     }
+
+    #join_attr: rows without a line in the matrices are left unchanged
+    @test "join_multi_file_3" {
+     result=`gtftk join_multi_file -i simple.gtf -k gene_id -t gene -m simple.join_mat simple.join_mat_2| gtftk select_by_key -g| gtftk tabulate -k gene_id,S1,S3 -Hun| wc -l`
+      [ "$result" -eq 3 ]
+    }
+
+    #join_attr: only the target features get the new keys
+    @test "join_multi_file_4" {
+     result=`gtftk join_multi_file -i simple.gtf -k gene_id -t gene -m simple.join_mat simple.join_mat_2| gtftk select_by_key -t| gtftk tabulate -k S1,S3 -Hun| wc -l`
+      [ "$result" -eq 0 ]
+    }
  
     """
 
@@ -12,13 +12,17 @@ import argparse
 import os
 import sys
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 import gc
+import numpy as np
 
+import pygtftk.utils
 from pygtftk import arg_formatter
 from pygtftk.arg_formatter import CheckChromFile
 from pygtftk.cmd_object import CmdObject
 from pygtftk.gtf_interface import GTF
+from pygtftk.utils import chrom_info_as_dict
 from pygtftk.utils import close_properly
 from pygtftk.utils import make_tmp_file
 from pygtftk.utils import message
@@ -123,6 +127,109 @@ def make_parser():
     return parser
 
 
+def find_overlaps(q_chrom, q_start, q_end, q_strand,
+                  s_chrom, s_start, s_end, s_strand,
+                  same_strandedness=False,
+                  diff_strandedness=False):
+    """Find the overlaps between a set of query regions and a set of subject
+    regions (zero-based, half-open coordinates, same rule as bedtools
+    intersect). Returns two arrays of indexes (query, subject) ordered by query
+    then subject.
+
+    Chromosomes are processed concurrently. For each one, subject regions
+    are sorted by start and indexed with the running maximum of their ends.
+    The candidate subjects of a query are found by two binary searches
+    (start < query end and running maximum of ends > query start) and
+    filtered on their end.
+
+    :param q_chrom: The query chromosomes (numpy array).
+    :param q_start: The query starts (numpy array).
+    :param q_end: The query ends (numpy array).
+    :param q_strand: The query strands (numpy array).
+    :param s_chrom: The subject chromosomes (numpy array).
+    :param s_start: The subject starts (numpy array).
+    :param s_end: The subject ends (numpy array).
+    :param s_strand: The subject strands (numpy array).
+    :param same_strandedness: Require same strandedness.
+    :param diff_strandedness: Require different strandedness.
+
+    :Example:
+
+    >>> import numpy as np
+    >>> from pygtftk.plugins.overlapping import find_overlaps
+    >>> c = np.array(['chr1', 'chr1', 'chr2'])
+    >>> st = np.array(['+', '-', '+'])
+    >>> q, s = find_overlaps(c, np.array([0, 5, 0]), np.array([10, 8, 2]), st, c, np.array([9, 2, 2]), np.array([20, 4, 3]), st)
+    >>> assert list(q) == [0, 0] and list(s) == [0, 1]
+    >>> q, s = find_overlaps(c, np.array([0, 5, 0]), np.array([10, 8, 2]), st, c, np.array([9, 2, 2]), np.array([20, 4, 3]), st, same_strandedness=True)
+    >>> assert list(q) == [0] and list(s) == [0]
+    """
+
+    def overlaps_on_chrom(idx):
+        q_idx, s_idx = idx
+
+        s_idx = s_idx[np.argsort(s_start[s_idx], kind='stable')]
+        s_st = s_start[s_idx]
+        s_en = s_end[s_idx]
+        s_max_en = np.maximum.accumulate(s_en)
+
+        # Candidate subjects of each query are s_idx[first:last]. Subjects
+        # before 'first' all end before the query start. A single long
+        # region does not widen the window of every query.
+        last = np.searchsorted(s_st, q_end[q_idx], side='left')
+        first = np.searchsorted(s_max_en, q_start[q_idx], side='right')
+        nb = np.maximum(last - first, 0)
+
+        q_hit = np.repeat(q_idx, nb)
+        offset = np.repeat(first - np.cumsum(nb) + nb, nb)
+        s_pos = np.arange(nb.sum()) + offset
+
+        keep = s_en[s_pos] > q_start[q_hit]
+        q_hit = q_hit[keep]
+        s_hit = s_idx[s_pos[keep]]
+
+        if same_strandedness:
+            keep = q_strand[q_hit] == s_strand[s_hit]
+            q_hit, s_hit = q_hit[keep], s_hit[keep]
+        elif diff_strandedness:
+            keep = q_strand[q_hit] != s_strand[s_hit]
+            q_hit, s_hit = q_hit[keep], s_hit[keep]
+
+        return q_hit, s_hit
+
+    # Regions are grouped by chromosome (one sort instead of one scan of
+    # all regions per chromosome). Chromosomes are independent and
+    # processed concurrently (numpy releases the GIL in sort/search).
+    chrom_codes = np.unique(np.concatenate([q_chrom, s_chrom]), return_inverse=True)[1]
+    q_code, s_code = chrom_codes[:len(q_chrom)], chrom_codes[len(q_chrom):]
+    nb_chrom = chrom_codes.max() + 1 if len(chrom_codes) else 0
+
+    q_order = np.argsort(q_code, kind='stable')
+    s_order = np.argsort(s_code, kind='stable')
+    q_groups = np.split(q_order, np.searchsorted(q_code[q_order], np.arange(1, nb_chrom)))
+    s_groups = np.split(s_order, np.searchsorted(s_code[s_order], np.arange(1, nb_chrom)))
+
+    chrom_idx = [(q, s) for q, s in zip(q_groups, s_groups) if len(q) and len(s)]
+
+    if not chrom_idx:
+        return np.array([], dtype=int), np.array([], dtype=int)
+
+    if len(chrom_idx) > 1:
+        with ThreadPoolExecutor(max_workers=min(8, len(chrom_idx))) as executor:
+            res = list(executor.map(overlaps_on_chrom, chrom_idx))
+    else:
+        res = [overlaps_on_chrom(chrom_idx[0])]
+
+    q_res = [x[0] for x in res]
+    s_res = [x[1] for x in res]
+
+    q_res = np.concatenate(q_res)
+    s_res = np.concatenate(s_res)
+    order = np.lexsort((s_res, q_res))
+
+    return q_res[order], s_res[order]
+
+
 def overlapping(
         inputfile=None,
         outputfile=None,
@@ -174,7 +281,7 @@ transcript from another gene.
     # if GTF stream comes from stdin
     gtf = GTF(inputfile)
 
-    message("Getting transcript in bed format")
+    message("Getting transcript coordinates")
 
     tx_feat = gtf.select_by_key("feature",
                                 "transcript")
@@ -188,56 +295,110 @@ transcript from another gene.
     # Get transcript limits
     # ----------------------------------------------------------------------
 
-    tx_bed = tx_feat.to_bed(name=["transcript_id", "gene_id"], sep="||")
+    # Zero-based coordinates of the transcripts are extracted in a single
+    # call (no conversion to BED and no BED parsing). Gene ids are turned
+    # into integer codes.
+    tx_data = tx_feat.extract_data("seqid,start,end,strand,transcript_id,gene_id",
+                                   as_list_of_list=True,
+                                   zero_based=True)
+    tx_data = np.array(tx_data, dtype=object).reshape(-1, 6)
+
+    s_chrom = tx_data[:, 0]
+    s_start = tx_data[:, 1].astype(np.int64)
+    s_end = tx_data[:, 2].astype(np.int64)
+    s_strand = tx_data[:, 3]
+    tx_ids = tx_data[:, 4]
+    gn_code = np.unique(tx_data[:, 5], return_inverse=True)[1]
 
     message("Getting " + feature_type + " and 'slopping'.")
 
-    if feature_type == "transcript":
-
-        bed_obj = tx_bed.slop(s=True,
-                              l=upstream,
-                              r=downstream,
-                              g=chrom_info.name).cut([0, 1, 2, 3, 4, 5])
+    # The regions of interest, before extension. TSSs and TTSs are
+    # one-base regions (start of the region given the strand).
+    get_regions = {'transcript': None,
+                   'promoter': lambda minus: np.where(minus, s_end - 1, s_start),
+                   'tts': lambda minus: np.where(minus, s_start, s_end - 1)}
 
-    elif feature_type == "promoter":
-
-        bed_obj = tx_feat.get_tss(name=["transcript_id", "gene_id"],
-                                  sep="||").slop(s=True,
-                                                 l=upstream,
-                                                 r=downstream,
-                                                 g=chrom_info.name).cut([0, 1,
-                                                                         2, 3,
-                                                                         4, 5])
-
-    elif feature_type == "tts":
-
-        bed_obj = tx_feat.get_tts(name=["transcript_id", "gene_id"],
-                                  sep="||").slop(s=True,
-                                                 l=upstream,
-                                                 r=downstream,
-                                                 g=chrom_info.name).cut([0, 1,
-                                                                         2, 3,
-                                                                         4, 5])
-    else:
+    if feature_type not in get_regions:
         message("Not implemented yet", type="ERROR")
 
-    tmp_file = make_tmp_file(feature_type + "_slopped_region", ".bed")
-    bed_obj.saveas(tmp_file.name)
-
-    overlap_regions = bed_obj.intersect(tx_bed,
-                                        wb=True,
-                                        s=same_strandedness,
-                                        S=diff_strandedness)
+    q_chrom, q_strand = s_chrom, s_strand
 
-    tmp_file = make_tmp_file(feature_type + "_overlapping_regions", ".bed")
-    overlap_regions.saveas(tmp_file.name)
-
-    for i in overlap_regions:
+    if get_regions[feature_type] is None:
+        q_start, q_end = s_start, s_end
+    else:
+        if not np.isin(s_strand, ['+', '-']).all():
+            message("Can not retrieve " + feature_type + " from unstranded transcripts.",
+                    type="ERROR")
+        q_start = get_regions[feature_type](s_strand == '-')
+        q_end = q_start + 1
+
+    # Extension of the regions (same as bedtools slop -s, computed
+    # in-process with numpy).
+    if upstream or downstream:
+        chrom_len = chrom_info_as_dict(chrom_info)
+        chrom_list, chrom_idx = np.unique(q_chrom, return_inverse=True)
+
+        missing = [x for x in chrom_list if x not in chrom_len]
+        if missing:
+            message("Chromosome(s) not found in chromosome info file: " + ",".join(missing),
+                    type="ERROR")
 
-        tx_other, gn_other = i.fields[9].split("||")
-        tx_id, gene_id = i.fields[3].split("||")
-        if gene_id != gn_other:
-            overlapping_tx[tx_id] += [tx_other]
+        chrom_size = np.array([chrom_len[x] for x in chrom_list], dtype=np.int64)[chrom_idx]
+        minus = q_strand == '-'
+        q_start = np.maximum(0, q_start - np.where(minus, downstream, upstream))
+        q_end = np.minimum(chrom_size, q_end + np.where(minus, upstream, downstream))
+
+    # Intermediate regions are only kept when debugging
+    if pygtftk.utils.VERBOSITY >= 2:
+        tmp_file = make_tmp_file(feature_type + "_slopped_region", ".bed")
+        for i in zip(q_chrom, q_start, q_end, tx_ids, q_strand):
+            tmp_file.write("\t".join([i[0], str(i[1]), str(i[2]), i[3], "0", i[4]]) + "\n")
+        tmp_file.close()
+
+    # Overlaps are computed in-process (no call to bedtools intersect).
+    # Transcripts often share the same TSS/TTS/limits: overlaps are
+    # searched once per distinct region and then fanned out.
+    q_chrom_code = np.unique(q_chrom, return_inverse=True)[1]
+    q_strand_code = (q_strand == '-').astype(np.int64)
+    _, q_rep, q_inv = np.unique(np.stack([q_chrom_code, q_strand_code, q_start, q_end], axis=1),
+                                axis=0, return_index=True, return_inverse=True)
+    q_inv = q_inv.ravel()
+
+    u_hit, s_hit = find_overlaps(q_chrom[q_rep], q_start[q_rep], q_end[q_rep], q_strand[q_rep],
+                                 s_chrom, s_start, s_end, s_strand,
+                                 same_strandedness=same_strandedness,
+                                 diff_strandedness=diff_strandedness)
+
+    # Query regions sharing a distinct region are q_by_u[u_first[u]:u_first[u] + u_nb[u]]
+    q_by_u = np.argsort(q_inv, kind='stable')
+    u_nb = np.bincount(q_inv, minlength=len(q_rep))
+    u_first = np.cumsum(u_nb) - u_nb
+
+    nb = u_nb[u_hit]
+    pos = np.arange(nb.sum()) - np.repeat(np.cumsum(nb) - nb, nb) + np.repeat(u_first[u_hit], nb)
+    q_hit = q_by_u[pos]
+    s_hit = np.repeat(s_hit, nb)
+
+    order = np.lexsort((s_hit, q_hit))
+    q_hit, s_hit = q_hit[order], s_hit[order]
+
+    # Overlaps with the same gene are discarded with an integer comparison.
+    # The remaining ones are grouped by query (q_hit is sorted) using offsets.
+    keep = gn_code[q_hit] != gn_code[s_hit]
+    q_hit, s_hit = q_hit[keep], s_hit[keep]
+
+    if len(q_hit):
+        offsets = np.concatenate([[0], np.flatnonzero(np.diff(q_hit)) + 1, [len(q_hit)]]).tolist()
+        tx_other = tx_ids[s_hit].tolist()
+        for q, first, last in zip(q_hit[offsets[:-1]], offsets[:-1], offsets[1:]):
+            overlapping_tx[tx_ids[q]] += tx_other[first:last]
+
+        # A transcript is reported once per overlapping transcript, even if
+        # the GTF contains duplicated transcript lines. Insertion order is
+        # kept (a set would make the annotation order random).
+        for k, v in overlapping_tx.items():
+            if len(v) > 1:
+                overlapping_tx[k] = list(dict.fromkeys(v))
 
     if bool:
         for k, _ in overlapping_tx.items():
@@ -249,7 +410,7 @@ transcript from another gene.
     if not invert_match:
 
         if not annotate_gtf:
-            value = ",".join(set(overlapping_tx.keys()))
+            value = ",".join(overlapping_tx)
             gtf.select_by_key("transcript_id",
                               value).write(outputfile,
                                            gc_off=True)
@@ -264,7 +425,7 @@ transcript from another gene.
                       gc_off=True)
 
     else:
-        values = ",".join(set(overlapping_tx.keys()))
+        values = ",".join(overlapping_tx)
         gtf.select_by_key("transcript_id",
                           values,
                           invert_match).write(outputfile, gc_off=True)
@@ -4,13 +4,12 @@
 """
 
 import argparse
+import io
 import os
 import re
-import shutil
 import sys
 import warnings
 import zipfile
-from collections import OrderedDict
 from zipfile import BadZipFile
 
 import matplotlib as mpl
@@ -20,6 +19,7 @@ import plotnine
 from matplotlib import cm
 from matplotlib import colors as mcolors
 from pandas import Categorical
+from pandas.errors import EmptyDataError
 from plotnine import aes, geom_text, scale_x_continuous, scale_color_manual, guide_legend, guides, ggtitle, \
     element_rect, element_blank, element_text, element_line, theme, facet_wrap, geom_rect
 from plotnine import geom_line
@@ -32,10 +32,8 @@ from pygtftk import arg_formatter
 from pygtftk.cmd_object import CmdObject
 from pygtftk.utils import ALL_MPL_PALETTES
 from pygtftk.utils import GTFtkError
-from pygtftk.utils import chomp
 from pygtftk.utils import is_hex_color
 from pygtftk.utils import make_outdir_and_file
-from pygtftk.utils import make_tmp_dir
 from pygtftk.utils import message
 
 __updated__ = "2018-01-20"
@@ -55,6 +53,44 @@ __references__ = """
  -- [1] Numerical Ecology - second Edition - P. Legendre, L. Legendre (1998) Elsevier.
 """
 
+# The coverage columns (bins) of a matrix produced by mk_matrix
+BIN_COLUMN_REGEXP = re.compile(r'(main_\d+)|(upstream_\d+)|(downstream_\d+)')
+
+# Image file name prefix for each feature type (as declared in the matrix)
+IMG_FILE_PREFIX = {'promoter': 'promoter',
+                   'tts': 'tts',
+                   'transcript': 'transcript',
+                   'user_regions': 'user_regions',
+                   'single_nuc': 'user_positions'}
+
+# Above this number of unique values, the ceiling is estimated from a sample
+MAX_UNIQUE_FOR_QUANTILE = 1000000
+
+
+def unique_quantile(values, q, max_val=MAX_UNIQUE_FOR_QUANTILE, seed=123):
+    """Returns the quantile q of the unique values. If there are more than
+    max_val unique values, the quantile is estimated from a random sample
+    (with a fixed seed) of max_val of them.
+
+    :param values: a pandas Series.
+    :param q: the quantile (between 0 and 1).
+    :param max_val: the maximum number of unique values used.
+    :param seed: the seed of the random sampling.
+
+    :Example:
+
+    >>> import pandas as pd
+    >>> from pygtftk.plugins.profile import unique_quantile
+    >>> assert unique_quantile(pd.Series([0, 0, 0, 1, 2, 3, 4]), 0.5) == 2
+    >>> assert unique_quantile(pd.Series(range(101)), 0.5, max_val=101) == 50
+    """
+    uniq = values.unique()
+
+    if len(uniq) > max_val:
+        uniq = np.random.RandomState(seed).choice(uniq, max_val, replace=False)
+
+    return np.percentile(uniq, q * 100)
+
 
 def make_parser():
     """The main parser."""
@@ -67,7 +103,7 @@ def make_parser():
                             help='A zip file containing a matrix as produced by mk_matrix.',
                             default=None,
                             metavar='MATRIX',
-                            type=arg_formatter.FormattedFile(mode='r', file_ext='zip'),
+                            type=arg_formatter.FormattedFile(mode='r', file_ext='zip', path_only=True),
                             required=True)
 
     parser_grp.add_argument('-o', '--out-dir',
@@ -80,7 +116,7 @@ def make_parser():
                             help="A two columns file with the transcripts"
                                  " of interest and their classes.",
                             default=None,
-                            type=argparse.FileType("r"),
+                            type=str,
                             required=False)
 
     parser_grp.add_argument('-s', '--stat',
@@ -200,7 +236,7 @@ def make_parser():
     parser_grp.add_argument('-if', '--user-img-file',
                             help="Provide an alternative path for the image.",
                             default=None,
-                            type=argparse.FileType("w"),
+                            type=str,
                             required=False)
 
     parser_grp.add_argument('-ul',
@@ -329,71 +365,65 @@ def profile(inputfile=None,
     #
     # -------------------------------------------------------------------------
 
-    if not inputfile.name.endswith('.zip'):
+    if not inputfile.endswith('.zip'):
         message("Not a valid zip file (*.zip).", type="ERROR")
 
-    base_input = os.path.split(os.path.abspath(inputfile.name))[1]
-    base_input = base_input.replace(".zip", "")
-    base_output = os.path.split(os.path.abspath(out_dir))[1]
+    if transcript_file is not None and not os.path.isfile(transcript_file):
+        message("Transcript file not found: " + transcript_file, type="ERROR")
+
+    # inputfile ends with '.zip' (checked above)
+    base_input = os.path.basename(inputfile)[:-4]
+    base_output = os.path.basename(os.path.abspath(out_dir))
 
-    if base_output in [base_input, base_input]:
+    if base_output == base_input:
         message("The input file and output directory should have different names.",
                 type="ERROR")
 
     # -------------------------------------------------------------------------
     #
-    # Unzipping input file
+    # Reading the matrix directly from the zip archive
     #
     # -------------------------------------------------------------------------
 
-    # Use a temp file to avoid concurrency issues
-    dir_name = make_tmp_dir(prefix='profile_matrix_')
+    # Only the first member (the matrix) is used. It is
+    # decompressed on the fly, no temporary copy is written.
+    try:
+        with zipfile.ZipFile(inputfile) as zf:
+            member = zf.namelist()[0]
+            message("Reading : " + member + " from " + inputfile,
+                    type="DEBUG")
+
+            with io.TextIOWrapper(zf.open(member)) as inputfile_main:
 
-    # Uncompressing the file
-    message("Uncompressing : " + dir_name,
-            type="DEBUG")
+                # -------------------------------------------------------------
+                # Retrieving info from the matrix file
+                # -------------------------------------------------------------
 
-    try:
-        with zipfile.ZipFile(inputfile.name) as zf:
-            zf.extractall(dir_name)
+                message("Getting configuration info from input file.")
+
+                # comment (line 0)
+                header = inputfile_main.readline().lstrip("#").rstrip("\r\n;")
+
+                # -------------------------------------------------------------
+                # Read coverage file (column names on line 1)
+                # start, end and strand are never used and are not parsed
+                # -------------------------------------------------------------
+
+                data = pd.read_csv(inputfile_main, sep="\t", header=0,
+                                   usecols=lambda x: x not in ('start', 'end', 'strand'),
+                                   dtype={'bwig': 'category', 'chrom': str, 'gene': str})
 
     except BadZipFile:
         message("Problem encountered when unzipping...",
                 type="ERROR")
 
-    inputfile_main = open(os.path.join(dir_name, zf.namelist()[0]), "r")
-    message("Reading : " + inputfile_main.name,
-            type="DEBUG")
-
-    # -------------------------------------------------------------------------
-    #
-    # Retrieving info from the matrix file
-    #
-    # -------------------------------------------------------------------------
+    if data.shape[0] == 0:
+        message("No lines found in input file.",
+                type="ERROR")
 
-    message("Getting configuration info from input file.")
-
-    input_file_tx = set()
-    input_file_chrom = set()
-    input_file_bwig = set()
-    header = ""
-
-    for line_number, line in enumerate(inputfile_main):
-
-        # comment (line 0)
-        if line_number == 0:
-            header = chomp(line.lstrip("#"))
-            header = header.rstrip(";")
-            continue
-        # skip header (line 1)
-        elif line_number > 1:
-            line = chomp(line)
-            field = line.split("\t")
-            tx_id = field[4]
-            chrom = field[1]
-            input_file_tx.add(tx_id)
-            input_file_chrom.add(chrom)
-            input_file_bwig.add(field[0])
+    input_file_tx = set(data['gene'].unique())
+    input_file_chrom = set(data['chrom'].unique())
+    input_file_bwig = set(data['bwig'].unique())
 
     if list_bwig:
         message("Bigwig list: " + ",".join(input_file_bwig), force=True)
@@ -405,11 +435,7 @@ def profile(inputfile=None,
     #
     # -------------------------------------------------------------------------
 
-    header = [x.split(":") for x in header.split(";")]
-
-    config = dict()
-    for x in header:
-        config[x[0]] = x[1]
+    config = dict(x.split(":", 1) for x in header.split(";"))
 
     # -------------------------------------------------------------------------
     #
@@ -448,29 +474,12 @@ def profile(inputfile=None,
                 message("If more than one bigWig is analyzed, --facet or --group-by should be set to 'bwig'.",
                         type="ERROR")
 
-    # -------------------------------------------------------------------------
-    #
-    # Read coverage file
-    #
-    # -------------------------------------------------------------------------
-
-    data = pd.read_csv(inputfile_main.name, sep="\t", header=1)
-    # import pickle
-    # data = pickle.load(file=open('dm_pickle.pic'))
-
-    if data.shape[0] == 0:
-        message("No lines found in input file.",
-                type="ERROR")
-
     # -------------------------------------------------------------------------
     #
     # Read transcript file
     #
     # -------------------------------------------------------------------------
 
-    # all tx/gene names of the dataframe
-    all_tx = list(OrderedDict.fromkeys(data['gene'].tolist()))
-
     if group_by == 'tx_classes' or facet_var == 'tx_classes':
         if transcript_file is not None:
             # -------------------------------------------------------------------------
@@ -478,20 +487,21 @@ def profile(inputfile=None,
             # -------------------------------------------------------------------------
 
             message("Reading transcript file.")
-            df_classes = pd.read_csv(transcript_file.name, sep='\t', header=None, dtype=str)
-
-            if df_classes.shape[0] == 0:
+            # Only the transcript and class columns are parsed
+            try:
+                df_classes = pd.read_csv(transcript_file, sep='\t', header=None,
+                                         usecols=[0, 1], dtype=str)
+            except EmptyDataError:
                 message("No lines found in transcript file.",
                         type="ERROR")
-
-            if len(df_classes.columns) < 2:
+            except ValueError:
                 message("The transcript file should contain at least two columns.",
                         type="ERROR")
 
             message("Deleting duplicates in transcript-file.")
             df_classes = df_classes.drop_duplicates(subset=[0])
             tx_ordering = df_classes[0].tolist()
-            tx_classes = OrderedDict(list(zip(df_classes[0], df_classes[1])))
+            tx_classes = dict(zip(df_classes[0], df_classes[1]))
             class_list = set(df_classes[1])
 
             # -------------------------------------------------------------------------
@@ -500,19 +510,20 @@ def profile(inputfile=None,
 
             message("Checking how many transcripts where found in the transcript list.")
 
-            nb_retained = len([x for x in all_tx if x in tx_ordering])
+            nb_retained = len(input_file_tx.intersection(tx_ordering))
 
-            msg = "Keeping {a} transcript out of {b} in input transcript list.".format(a=nb_retained, b=len(all_tx))
+            msg = "Keeping {a} transcript out of {b} in input transcript list.".format(a=nb_retained,
+                                                                                       b=len(input_file_tx))
             message(msg)
 
             # subsetting
-            data = data[[True if x in tx_ordering else False for x in data['gene'].tolist()]]
-            data = data.assign(tx_classes=[tx_classes[x] for x in data['gene'].tolist()])
+            data = data[data['gene'].isin(tx_ordering)]
+            data = data.assign(tx_classes=data['gene'].map(tx_classes))
         else:
-            data = data.assign(tx_classes=["All transcripts" for x in data['gene'].tolist()])
+            data = data.assign(tx_classes="All transcripts")
             class_list = ["All transcripts"]
     else:
-        data = data.assign(tx_classes=["All transcripts" for x in data['gene'].tolist()])
+        data = data.assign(tx_classes="All transcripts")
         class_list = ["All transcripts"]
 
     # -------------------------------------------------------------------------
@@ -531,7 +542,8 @@ def profile(inputfile=None,
         else:
             number_use = number
         colormap = cm.get_cmap(pal, lut=number_use)
-        colors = [mpl.colors.rgb2hex(colormap(i)) for i in np.linspace(0., 1., number_use)]
+        # A single lookup in the colormap table for all the requested colors
+        colors = [mpl.colors.rgb2hex(x) for x in colormap(np.linspace(0., 1., number_use))]
 
         if number == 1:
             colors = [colors[0]]
@@ -583,37 +595,23 @@ def profile(inputfile=None,
 
     else:
         color_order = color_order.split(",")
-        color_order_pb = False
 
         if group_by == 'bwig':
-            if len(color_order) != len(input_file_bwig):
-                color_order_pb = True
-            if len(set(color_order)) != len(set(input_file_bwig)):
-                color_order_pb = True
-            for co in color_order:
-                if co not in input_file_bwig:
-                    color_order_pb = True
-
+            expected_levels = input_file_bwig
         elif group_by == 'tx_classes':
-            if len(color_order) != len(class_list):
-                color_order_pb = True
-            if len(set(color_order)) != len(set(class_list)):
-                color_order_pb = True
-            for co in color_order:
-                if co not in class_list:
-                    color_order_pb = True
-
+            expected_levels = class_list
         elif group_by == 'chrom':
-            if len(color_order) != len(list(input_file_chrom)):
-                color_order_pb = True
-            if len(set(color_order)) != len(set(list(input_file_chrom))):
-                color_order_pb = True
-            for co in color_order:
-                if co not in list(input_file_chrom):
-                    color_order_pb = True
-
+            expected_levels = input_file_chrom
         else:
+            expected_levels = None
+
+        # color_order should be a permutation of the expected levels
+        if expected_levels is None:
             color_order_pb = True
+        else:
+            color_order_pb = len(color_order) != len(expected_levels) or \
+                             set(color_order) != set(expected_levels)
+
         if color_order_pb:
             message("Please, check --color-order.", type="ERROR")
 
@@ -664,49 +662,34 @@ def profile(inputfile=None,
     #
     # -------------------------------------------------------------------------
 
-    if config['ft_type'] == 'promoter':
-
-        img_file = "promoter_u%s_d%s." + page_format
-        img_file = img_file % (config['from'], config['to'])
-
-    elif config['ft_type'] == 'tts':
-
-        img_file = "tts_u%s_d%s." + page_format
-        img_file = img_file % (config['from'], config['to'])
-
-    elif config['ft_type'] == 'transcript':
-
-        img_file = "transcript_u%s_d%s." + page_format
-        img_file = img_file % (config['from'], config['to'])
-
-    elif config['ft_type'] == 'user_regions':
-        img_file = "user_regions_u%s_d%s." + page_format
-        img_file = img_file % (config['from'], config['to'])
-
-    elif config['ft_type'] == 'single_nuc':
-        img_file = "user_positions_u%s_d%s." + page_format
-        img_file = img_file % (config['from'], config['to'])
-    else:
+    if config['ft_type'] not in IMG_FILE_PREFIX:
         raise GTFtkError("Unknown feature type.")
 
-    file_out_list = make_outdir_and_file(out_dir,
-                                         ["profile_stats.txt",
-                                          img_file],
-                                         force=True)
-
-    data_file, img_file = file_out_list
-
-    if user_img_file is not None:
+    img_file = "{p}_u{u}_d{d}.{f}".format(p=IMG_FILE_PREFIX[config['ft_type']],
+                                         u=config['from'],
+                                         d=config['to'],
+                                         f=page_format)
 
-        os.unlink(img_file.name)
-        img_file = user_img_file
+    if user_img_file is None:
+        data_file, img_file = make_outdir_and_file(out_dir,
+                                                   ["profile_stats.txt",
+                                                    img_file],
+                                                   force=True)
+        # The image is written by plotnine, only the path is needed
+        img_file.close()
+        img_file = img_file.name
 
-        if not img_file.name.endswith(page_format):
+    else:
+        if not user_img_file.endswith(page_format):
             msg = "Image format: {f}. Please fix.".format(f=page_format)
             message(msg, type="ERROR")
 
-        test_path = os.path.abspath(img_file.name)
-        test_path = os.path.dirname(test_path)
+        data_file = make_outdir_and_file(out_dir,
+                                         ["profile_stats.txt"],
+                                         force=True)[0]
+        img_file = user_img_file
+
+        test_path = os.path.dirname(os.path.abspath(img_file))
 
         if not os.path.exists(test_path):
             os.makedirs(test_path)
@@ -719,11 +702,7 @@ def profile(inputfile=None,
 
     message("Searching coverage columns.")
 
-    pos_order = []
-
-    for i in data.columns:
-        if re.search('(main_\d+)|(upstream_\d+)|(downstream_\d+)', i):
-            pos_order += [i]
+    pos_order = [x for x in data.columns if BIN_COLUMN_REGEXP.search(x)]
 
     bin_nb_main = len([x for x in data.columns if "main" in x])
     bin_nb_ups = len([x for x in data.columns if "upstream" in x])
@@ -736,18 +715,29 @@ def profile(inputfile=None,
     #
     # -------------------------------------------------------------------------
 
-    message("Melting.")
-    dm = data.melt(id_vars=['tx_classes', 'bwig', 'chrom', 'start', 'end', 'gene', 'strand'], value_vars=pos_order)
-    dm = dm.rename(columns={'variable': 'pos', 'value': 'exprs'})
-    dm['bwig'] = Categorical(dm['bwig'])
+    # Subsetting before melting (one row per region instead of one per bin)
+    if subset_bwig is not None:
+        data = data[data['bwig'].isin(input_file_bwig)]
 
-    # -------------------------------------------------------------------------
-    #
-    # Subsetting dm if required
-    #
-    # -------------------------------------------------------------------------
+    # Only bwig (ceiling/normalization) and the grouping
+    # variables are used downstream.
+    id_vars = ['bwig']
+    for i in [group_by, facet_var]:
+        if i is not None and i not in id_vars:
+            id_vars += [i]
 
-    dm = dm[dm['bwig'].isin(input_file_bwig)]
+    message("Melting.")
+    dm = data.melt(id_vars=id_vars,
+                   value_vars=pos_order,
+                   var_name='pos',
+                   value_name='exprs')
+    # bwig is read as a categorical (one hash per distinct value
+    # in the C parser), only the subsetted out levels are dropped.
+    dm['bwig'] = dm['bwig'].cat.remove_unused_categories()
+    # melt() stacks the bins one after the other. The bin factor is thus
+    # known without hashing and is reused by all the groupby() below.
+    dm['pos'] = Categorical.from_codes(np.repeat(np.arange(len(pos_order)), data.shape[0]),
+                                       categories=pos_order)
 
     # -------------------------------------------------------------------------
     #
@@ -757,11 +747,9 @@ def profile(inputfile=None,
 
     if upper_limit < 1:
         message('Ceiling')
-        for k in dm['bwig'].unique():
-            tmp = dm[dm.bwig == k]['exprs'].tolist()
-            qu = np.percentile(list(set(tmp)), upper_limit * 100)
-            tmp = [qu if x > qu else x for x in tmp]
-            dm.loc[dm.bwig == k, 'exprs'] = tmp
+        # quantile of unique values computed per bigwig
+        qu = dm.groupby('bwig', observed=True)['exprs'].agg(lambda x: unique_quantile(x, upper_limit))
+        dm['exprs'] = dm['exprs'].clip(upper=dm['bwig'].map(qu).astype(float))
 
     # -------------------------------------------------------------------------
     #
@@ -770,7 +758,7 @@ def profile(inputfile=None,
     # -------------------------------------------------------------------------
 
     if to_log:
-        if dm[dm.exprs == 0].shape[0] > 0:
+        if (dm['exprs'] == 0).any():
             message("Zero value detected. Adding a pseudocount (+1) before log transformation.")
             dm['exprs'] = np.array(dm['exprs']) + 1
 
@@ -784,10 +772,13 @@ def profile(inputfile=None,
 
     if normalization_method == 'ranging':
         message('Normalizing (ranging)')
-        for k in dm['bwig'].unique():
-            tmp = np.array(dm[dm.bwig == k]['exprs'].tolist())
-            tmp_norm = (tmp - min(tmp)) / (max(tmp) - min(tmp)) * 100
-            dm.loc[dm.bwig == k, 'exprs'] = tmp_norm
+        # range computed once per bigwig (one row per category, in
+        # category order) then gathered through the category codes
+        bwig_range = dm.groupby('bwig', observed=False)['exprs'].agg(['min', 'max'])
+        bwig_codes = dm['bwig'].cat.codes.values
+        min_val = bwig_range['min'].values[bwig_codes]
+        max_val = bwig_range['max'].values[bwig_codes]
+        dm['exprs'] = (dm['exprs'] - min_val) / (max_val - min_val) * 100
 
         y_lab = "scaled(" + y_lab + ", %)"
 
@@ -802,17 +793,18 @@ def profile(inputfile=None,
     else:
         df_aggr_var = [group_by] + [facet_var] + ['pos']
 
-    dm = dm.groupby(df_aggr_var, as_index=False).agg({'exprs': ['mean', 'median', 'mad',
-                                                                'std', 'min', 'max',
-                                                                'sum', len]})
+    # Only built-in (cythonized) reductions are used. The mean absolute
+    # deviation is the mean of the absolute deviations to the group mean.
+    dm['abs_dev'] = (dm['exprs'] - dm.groupby(df_aggr_var)['exprs'].transform('mean')).abs()
 
-    # -------------------------------------------------------------------------
-    #
-    # Multi-indexed dataframes (various column name levels) are not easy to
-    # handle
-    # -------------------------------------------------------------------------
-
-    dm.columns = [x[1] if len(x) > 1 and x[1] != '' else x[0] for x in np.array(dm.columns).ravel()]
+    dm = dm.groupby(df_aggr_var, as_index=False).agg(mean=('exprs', 'mean'),
+                                                     median=('exprs', 'median'),
+                                                     mad=('abs_dev', 'mean'),
+                                                     std=('exprs', 'std'),
+                                                     min=('exprs', 'min'),
+                                                     max=('exprs', 'max'),
+                                                     sum=('exprs', 'sum'),
+                                                     len=('exprs', 'size'))
 
     # -------------------------------------------------------------------------
     #
@@ -836,18 +828,12 @@ def profile(inputfile=None,
 
     message("Computing column ordering.")
 
+    pos_levels = dm.pos.unique()
     pos_order = []
 
-    tmp = [x for x in dm.pos.unique() if 'upstream' in x]
-    pos_order += sorted(sorted(tmp, reverse=True), key=lambda x: int(x.split("_")[1]))
-
-    tmp = [x for x in dm.pos.unique() if 'main' in x]
-    pos_order += sorted(sorted(tmp, reverse=True), key=lambda x: int(x.split("_")[1]))
-
-    tmp = [x for x in dm.pos.unique() if 'downstream' in x]
-    pos_order += sorted(sorted(tmp, reverse=True), key=lambda x: int(x.split("_")[1]))
-
-    dm.pos = Categorical(dm.pos.tolist(), categories=pos_order, ordered=True)
+    for region in ['upstream', 'main', 'downstream']:
+        tmp = [x for x in pos_levels if region in x]
+        pos_order += sorted(tmp, key=lambda x: int(x.split("_")[1]))
 
     # -------------------------------------------------------------------------
     #
@@ -855,26 +841,23 @@ def profile(inputfile=None,
     #
     # -------------------------------------------------------------------------
 
+    is_tx = config['ft_type'] in ["transcript", "user_regions"]
+
     fr = round(int(config['from']), 0)
     to = round(int(config['to']), 0)
 
-    if config['ft_type'] in ["transcript", "user_regions"]:
-
-        dm = dm.assign(extra=dm.pos.cat.codes)
-        seq = np.linspace(0, 100, len(dm.extra.unique()))
-        dm.extra = seq[dm.extra]
-        dm.extra = [float(x) for x in dm.extra]
-        dm.pos = dm.extra
-
-
+    if is_tx:
+        seq = np.linspace(0, 100, len(pos_order))
     else:
-        dm = dm.assign(extra=dm.pos.cat.codes)
-        seq = np.linspace(-fr, to, len(dm.pos.unique()))
-        dm.extra = seq[dm.extra]
-        dm.extra = [float(x) for x in dm.extra]
-        dm.pos = dm.extra
+        seq = np.linspace(-fr, to, len(pos_order))
 
-    dm = dm.drop('extra', axis=1)
+    # One x coordinate per bin. The ordering is applied to the (few)
+    # categories and the coordinates are looked up through the codes
+    # in a single pass over the column.
+    pos_rank = {x: i for i, x in enumerate(pos_order)}
+    cat_to_x = np.array([seq[pos_rank[x]] if x in pos_rank else np.nan
+                         for x in dm.pos.cat.categories])
+    dm.pos = cat_to_x[dm.pos.cat.codes]
 
     # -------------------------------------------------------------------------
     #
@@ -890,16 +873,15 @@ def profile(inputfile=None,
         dm_nb.columns = [x[1] if len(x) > 1 and x[1] != '' else x[0] for x in dm_nb.columns.ravel()]
         max_val = dm_nb['max'].iloc[dm_nb['max'].idxmax(),]
         min_val = dm_nb['min'].iloc[dm_nb['min'].idxmax(),]
-        y_pos = np.linspace(start=(max_val - min_val) / 1.5, stop=max_val, num=len(dm[group_by].unique()))
-        for i, j in zip(y_pos, dm[group_by].unique()):
-            tmp = [i] * dm_nb['max'][dm_nb[group_by] == j].shape[0]
-            dm_nb.loc[dm_nb[group_by] == j, 'max'] = tmp
-        if config['ft_type'] in ["transcript", "user_regions"]:
-            dm_nb = dm_nb.assign(x=pd.Series(np.repeat(85, dm_nb.shape[0])).values)
+        groups = dm[group_by].unique()
+        y_pos = np.linspace(start=(max_val - min_val) / 1.5, stop=max_val, num=len(groups))
+        # one y position per group, broadcast to the rows with a lookup
+        dm_nb['max'] = dm_nb[group_by].map(dict(zip(groups, y_pos))).astype(float)
+        if is_tx:
+            dm_nb['x'] = 85
         else:
-            dm_nb = dm_nb.assign(x=pd.Series(np.repeat(int(config["to"]) - int(config["to"]) / 3,
-                                                       dm_nb.shape[0])).values)
-        dm_nb = dm_nb.assign(hjust=pd.Series(np.repeat(0, dm_nb.shape[0])).values)
+            dm_nb['x'] = int(config["to"]) - int(config["to"]) / 3
+        dm_nb['hjust'] = 0
         dm_nb.len = dm_nb.len.astype(int)
         dm_nb['nb_obs'] = 'n=' + dm_nb['len'].astype(str)
 
@@ -916,7 +898,7 @@ def profile(inputfile=None,
     #
     # -------------------------------------------------------------------------
     group2cols = dict(list(zip(color_order, profile_colors)))
-    dm['color_palette'] = [group2cols[x] for x in dm[group_by]]
+    dm['color_palette'] = dm[group_by].map(group2cols).astype(str)
 
     # -------------------------------------------------------------------------
     #
@@ -928,7 +910,12 @@ def profile(inputfile=None,
 
     message("Preparing diagram")
 
-    p = ggplot(data=dm,
+    # ggplot copies its data several times when building the plot.
+    # Only the variables mapped at the plot level (and the facetting
+    # variable) are given to it. Other layers receive their own data.
+    plot_var = list(dict.fromkeys([x for x in ['pos', stat, group_by, facet_var] if x is not None]))
+
+    p = ggplot(data=dm[plot_var],
                mapping=aes(x='pos',
                            y=stat,
                            color=group_by))
@@ -945,51 +932,26 @@ def profile(inputfile=None,
     # TODO: improve this. Particularly buggy (I guess) with the current version of
     # plotnine
 
-    if confidence_interval:
+    if confidence_interval and stat in ["mean", "median"]:
+        if stat == "mean":
+            ribbon_aes = aes(ymin='ci_low', ymax='ci_high')
+        else:
+            ribbon_aes = aes(ymin='ci_low_robust', ymax='ci_high_robust')
+
         if facet_var is not None:
-            if stat == "mean":
-                for i in range(len(color_order)):
-                    for j in dm[facet_var].unique():
-                        dm_sub = dm[(dm[group_by] == color_order[i]) & (dm[facet_var] == j)].sort_values('pos')
-                        p += plotnine.geom_ribbon(data=dm_sub,
-                                                  mapping=aes(ymin='ci_low',
-                                                              ymax='ci_high'),
-                                                  show_legend=False,
-                                                  fill=list(dm_sub.color_palette.unique())[0],
-                                                  color=None,
-                                                  alpha=0.3)
-            elif stat == "median":
-                for i in range(len(color_order)):
-                    for j in dm[facet_var].unique():
-                        dm_sub = dm[(dm[group_by] == color_order[i]) & (dm[facet_var] == j)].sort_values('pos')
-                        p += plotnine.geom_ribbon(data=dm_sub,
-                                                  mapping=aes(ymin='ci_low_robust',
-                                                              ymax='ci_high_robust'),
-                                                  show_legend=False,
-                                                  fill=list(dm_sub.color_palette.unique())[0],
-                                                  color=None,
-                                                  alpha=0.3)
+            ribbon_var = [group_by, facet_var]
         else:
-            if stat == "mean":
-                for i in range(len(color_order)):
-                    dm_sub = dm[dm[group_by] == color_order[i]].sort_values('pos')
-                    p += plotnine.geom_ribbon(data=dm_sub,
-                                              mapping=aes(ymin='ci_low',
-                                                          ymax='ci_high'),
-                                              show_legend=False,
-                                              fill=list(dm_sub.color_palette.unique())[0],
-                                              color=None,
-                                              alpha=0.3)
-            elif stat == "median":
-                for i in range(len(color_order)):
-                    dm_sub = dm[dm[group_by] == color_order[i]].sort_values('pos')
-                    p += plotnine.geom_ribbon(data=dm_sub,
-                                              mapping=aes(ymin='ci_low_robust',
-                                                          ymax='ci_high_robust'),
-                                              show_legend=False,
-                                              fill=list(dm_sub.color_palette.unique())[0],
-                                              color=None,
-                                              alpha=0.3)
+            ribbon_var = [group_by]
+
+        # A single pass over dm to get one ribbon per group (and facet)
+        for _, dm_sub in dm.groupby(ribbon_var, observed=True):
+            dm_sub = dm_sub.sort_values('pos')
+            p += plotnine.geom_ribbon(data=dm_sub,
+                                      mapping=ribbon_aes,
+                                      show_legend=False,
+                                      fill=dm_sub.color_palette.iloc[0],
+                                      color=None,
+                                      alpha=0.3)
 
     # -------------------------------------------------------------------------
     #
@@ -1034,7 +996,7 @@ def profile(inputfile=None,
 
     message("Preparing x axis")
 
-    if config['ft_type'] in ["transcript", "user_regions"]:
+    if is_tx:
 
         if config['from']:
 
@@ -1100,7 +1062,7 @@ def profile(inputfile=None,
     # -------------------------------------------------------------------------
     # Using the same dataframe as plotnine is still
     # very fragile.
-    if config['ft_type'] in ["transcript", "user_regions"]:
+    if is_tx:
         message("Highlighting upstream regions")
 
         dm['xmin_fr'] = [0 for x in range(dm.shape[0])]
@@ -1198,7 +1160,7 @@ def profile(inputfile=None,
     # -------------------------------------------------------------------------
 
     if page_width is None:
-        if config['ft_type'] in ["transcript", "user_regions"]:
+        if is_tx:
             panel_width = 4
         else:
             panel_width = 3
@@ -1210,8 +1172,9 @@ def profile(inputfile=None,
         if facet_var is None:
             page_height = panel_height
         else:
-            panel_nb = len(dm[facet_var].unique()) / facet_col
-            modulo = len(dm[facet_var].unique()) % facet_col
+            nb_facet = len(dm[facet_var].unique())
+            panel_nb = nb_facet / facet_col
+            modulo = nb_facet % facet_col
             if modulo:
                 panel_nb += 1
             page_height = panel_nb * panel_height
@@ -1228,19 +1191,16 @@ def profile(inputfile=None,
     with warnings.catch_warnings():
         warnings.simplefilter("ignore")
         fxn()
-        message("Saving diagram to file : " + img_file.name)
+        message("Saving diagram to file : " + img_file)
         message("Be patient. This may be long for large datasets.")
         try:
-            p.save(filename=img_file.name, width=page_width, height=page_height, dpi=dpi, limitsize=False)
+            p.save(filename=img_file, width=page_width, height=page_height, dpi=dpi, limitsize=False)
         except PlotnineError as err:
             message("Plotnine message: " + err.message)
             message("Plotnine encountered an error.", type="ERROR")
 
         dm.to_csv(data_file, sep="\t", header=True, index=False)
 
-    # Delete temporary dir
-    shutil.rmtree(dir_name)
-
 
 if __name__ == '__main__':
     myparser = make_parser()
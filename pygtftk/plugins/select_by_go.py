@@ -5,7 +5,6 @@
 
 import argparse
 import sys
-from collections import OrderedDict
 
 import os
 
@@ -68,6 +67,10 @@ def make_parser():
                         default='',
                         type=str,
                         required=False)
+
+    parser.add_argument('-nc', '--no-cache',
+                        help='Do not use the cached lists of Biomart databases/datasets.',
+                        action="store_true")
     return parser
 
 
@@ -89,17 +92,20 @@ def select_by_go(inputfile=None,
                  http_proxy=None,
                  list_datasets=None,
                  species=None,
-                 invert_match=False):
+                 invert_match=False,
+                 no_cache=False):
     """ Select lines from a GTF file based using a Gene Ontology ID (e.g GO:0050789).
     """
 
     if not go_id.startswith("GO:"):
         go_id = "GO:" + go_id
 
-    is_associated = OrderedDict()
+    is_associated = []
+    seen = set()
 
     bm = Biomart(http_proxy=http_proxy,
-                 https_proxy=https_proxy)
+                 https_proxy=https_proxy,
+                 cache=not no_cache)
 
     bm.get_datasets('ENSEMBL_MART_ENSEMBL')
 
@@ -111,17 +117,18 @@ def select_by_go(inputfile=None,
         if species + "_gene_ensembl" not in bm.datasets:
             message("Unknow dataset/species.", type="ERROR")
 
-    bm.query({'query': XML.format(species=species, go=go_id)})
+    bm.query({'query': XML.format(species=species, go=go_id)}, stream=True)
 
-    for i in bm.response.content.decode().split("\n"):
+    for i in bm.iter_lines():
         i = i.rstrip("\n")
-        if i != '':
-            is_associated[i] = 1
+        if i != '' and i not in seen:
+            seen.add(i)
+            is_associated.append(i)
 
     gtf = GTF(inputfile)
 
     gtf_associated = gtf.select_by_key("gene_id",
-                                       ",".join(list(is_associated.keys())),
+                                       is_associated,
                                        invert_match)
 
     gtf_associated.write(outputfile,
@@ -10,6 +10,7 @@ import sys
 import os
 
 from pygtftk import arg_formatter
+from pygtftk.Line import FeatureWriter
 from pygtftk.arg_formatter import CheckChromFile
 from pygtftk.cmd_object import CmdObject
 from pygtftk.gtf_interface import GTF
@@ -91,6 +92,8 @@ def shift(inputfile=None,
         if chr not in chrom_info:
             raise GTFtkError("Chromosome " + chr + " was not found in chrom-info file.")
 
+    out = FeatureWriter(outputfile)
+
     for i in gtf:
         size = i.end - i.start + 1
         if not stranded:
@@ -129,8 +132,9 @@ def shift(inputfile=None,
         if new_start is not None and new_end is not None:
             i.start = new_start
             i.end = new_end
-            i.write(outputfile)
+            i.write(out)
 
+    out.close()
     gc.disable()
     close_properly(outputfile, inputfile)
 
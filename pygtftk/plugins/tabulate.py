@@ -126,17 +126,12 @@ def tabulate(inputfile=None,
     # Check mode
     # ----------------------------------------------------------------------
 
-    if select_transcript_ids:
-        key = "transcript_id"
+    shortcuts = [(select_transcript_ids, "transcript_id"),
+                 (select_gene_ids, "gene_id"),
+                 (select_gene_names, "gene_id"),
+                 (select_exon_ids, "exon_id")]
 
-    elif select_gene_ids:
-        key = "gene_id"
-
-    elif select_gene_names:
-        key = "gene_id"
-
-    elif select_exon_ids:
-        key = "exon_id"
+    key = next((k for selected, k in shortcuts if selected), key)
 
     no_undef = False
     if not accept_undef:
@@ -147,14 +142,17 @@ def tabulate(inputfile=None,
 
     gtf = GTF(inputfile, check_ensembl_format=False)
 
+    # Only the requested columns are filled by libgtftk.
+    # Redundant rows (-u) are also discarded by libgtftk.
     if key in ["all", "*"]:
         if no_basic:
-            attr_list = gtf.get_attr_list(add_basic=False)
+            tab = gtf.extract_data(gtf.get_attr_list(add_basic=False),
+                                   nr=unique)
         else:
-            attr_list = gtf.get_attr_list(add_basic=True)
-        tab = gtf.extract_data(attr_list)
+            # libgtftk lists the attributes itself (no pre-scan needed)
+            tab = gtf.extract_data("all", nr=unique)
     else:
-        tab = gtf.extract_data(key)
+        tab = gtf.extract_data(key.split(","), nr=unique)
 
     if not no_header:
         message("Writing header")
@@ -163,64 +161,15 @@ def tabulate(inputfile=None,
 
     message("Writing")
 
-    try:
-        if not unique:
-            if no_unset:
-                if no_undef:
-                    for i in tab:
-                        if any([True for x in i.fields if x in [".", "?"]]):
-                            continue
-                        i.write(outputfile, separator)
-                else:
-                    for i in tab:
-                        if any([True for x in i.fields if x in ["."]]):
-                            continue
-                        i.write(outputfile, separator)
-
-            else:
-                if no_undef:
-                    for i in tab:
-                        if any([True for x in i.fields if x in ["?"]]):
-                            continue
-                        i.write(outputfile, separator)
-                else:
-                    for i in tab:
-                        i.write(outputfile, separator)
+    # Lines containing one of these values are discarded.
+    skipped = []
+    if no_unset:
+        skipped += ["."]
+    if no_undef:
+        skipped += ["?"]
 
-        else:
-            printed = {}
-            if no_unset:
-                if no_undef:
-                    for i in tab:
-                        t = tuple(i)
-                        if t not in printed:
-                            if any([True for x in i.fields if x in [".", "?"]]):
-                                continue
-                            i.write(outputfile, separator)
-                        printed[t] = 1
-                else:
-                    for i in tab:
-                        t = tuple(i)
-                        if t not in printed:
-                            if any([True for x in i.fields if x in ["."]]):
-                                continue
-                            i.write(outputfile, separator)
-                        printed[t] = 1
-            else:
-                if no_undef:
-                    for i in tab:
-                        t = tuple(i)
-                        if t not in printed:
-                            if any([True for x in i.fields if x in ["?"]]):
-                                continue
-                            i.write(outputfile, separator)
-                        printed[t] = 1
-                else:
-                    for i in tab:
-                        t = tuple(i)
-                        if t not in printed:
-                            i.write(outputfile, separator)
-                        printed[t] = 1
+    try:
+        tab.write(outputfile, separator, skip=skipped)
 
     except (BrokenPipeError, IOError):
         def _void_f(*args, **kwargs):
@@ -315,6 +264,30 @@ else:
      result=`gtftk tabulate -i  simple.gtf -k all -x | awk  -F "\t" '{print NF}'| sort | uniq`
       [ "$result" -eq 12 ]
     }
+
+    # tabulate: check -u keeps the first occurrence of each row
+    @test "tabulate_11" {
+     result=`gtftk tabulate -i  simple.gtf -k feature,gene_id -uH -s ":" | head -n 3 | tr "\\n" ","`
+      [ "$result" = "gene:G0001,transcript:G0001,exon:G0001," ]
+    }
+
+    # tabulate: check -u keeps rows with unset values without -n
+    @test "tabulate_12" {
+     result=`gtftk tabulate -i  simple.gtf -k gene_id,score -uxH | wc -l`
+      [ "$result" -eq 10 ]
+    }
+
+    # tabulate: check -n discards rows with unset values
+    @test "tabulate_13" {
+     result=`gtftk tabulate -i  simple.gtf -k gene_id,score -unxH | wc -l`
+      [ "$result" -eq 0 ]
+    }
+
+    # tabulate: check -un with a separator
+    @test "tabulate_14" {
+     result=`gtftk tabulate -i  simple.gtf -k gene_id,ccds_id -unH -s ":" | head -n 1`
+      [ "$result" = "G0001:CDS_G0001T002" ]
+    }
     
     
     
@@ -14,6 +14,7 @@ extern INDEX_ID *index_gtf(GTF_DATA *gtf_data, char *key);
 extern int compare_row_list(const void *p1, const void *p2);
 extern GTF_DATA *clone_gtf_data(GTF_DATA *gtf_data);
 extern void add_attribute(GTF_ROW *row, char *key, char *value);
+extern int is_in_attrs(GTF_ROW *row, char *at);
 
 /*
  * global variables declaration
@@ -63,3 +64,66 @@ GTF_DATA *add_attributes(GTF_DATA *gtf_data, char *features, char *key, char *ne
 	fclose(input);
 	return ret;
 }
+
+/*
+ * Same as add_attributes but several new keys can be added through a single
+ * copy and a single indexation of the GTF_DATA. Each line of the input file
+ * contains 3 tab separated fields: the value of key, the new key and its
+ * value. For a given row, the new attributes are added in the order of the
+ * file lines. If the row already has the new key, its value is replaced (as
+ * when the files were joined one after the other), except for the key used
+ * to join whose values are referenced by the index.
+ *
+ * Parameters:
+ * 		gtf_data:			the GTF data
+ * 		features:			the features to which the attributes are added ("*" for all)
+ * 		key:				the key used to join
+ * 		inputfile_name:		the 3 columns input file
+ *
+ * Returns:					the new GTF_DATA
+ */
+__attribute__ ((visibility ("default")))
+GTF_DATA *add_attributes_multi(GTF_DATA *gtf_data, char *features, char *key, char *inputfile_name) {
+	int i, k;
+	ssize_t l;
+	GTF_DATA *ret = clone_gtf_data(gtf_data);
+	INDEX_ID *ix = index_gtf(ret, key);
+	GTF_ROW *row;
+
+	FILE *input = fopen(inputfile_name, "ro");
+	size_t buffersize = 1000;
+	char *buffer = (char *)calloc(buffersize, sizeof(char));
+	char *value, *new_key, *new_value;
+	ROW_LIST **find_row_list, *test_row_list = (ROW_LIST *)calloc(1, sizeof(ROW_LIST));
+
+	while ((l = getline(&buffer, &buffersize, input)) > 0) {
+		if (buffer[l - 1] == '\n') buffer[l - 1] = 0;
+		value = buffer;
+		if ((new_key = strchr(value, '\t')) == NULL) continue;
+		*new_key++ = 0;
+		if ((new_value = strchr(new_key, '\t')) == NULL) continue;
+		*new_value++ = 0;
+		test_row_list->token = value;
+		find_row_list = (ROW_LIST **)tfind(test_row_list, &(column[ix->column]->index[ix->index_rank]->data), compare_row_list);
+		if (find_row_list != NULL)
+			for (i = 0; i < (*find_row_list)->nb_row; i++) {
+				row = ret->data[(*find_row_list)->row[i]];
+				if (!strcmp(features, "*") || strstr(features, row->field[2])) {
+					k = strcmp(new_key, key) ? is_in_attrs(row, new_key) : -1;
+					if (k != -1) {
+						free((row->attributes.attr + k)->value);
+						(row->attributes.attr + k)->value = strdup(new_value);
+					}
+					else
+						add_attribute(row, new_key, new_value);
+				}
+			}
+	}
+	if (test_row_list != NULL) {
+		if (test_row_list->row != NULL) free(test_row_list->row);
+		free(test_row_list);
+	}
+	free(buffer);
+	fclose(input);
+	return ret;
+}
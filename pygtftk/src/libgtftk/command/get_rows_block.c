@@ -0,0 +1,176 @@
+/*
+ * get_rows_block.c
+ *
+ *  Objective: serialize a range of GTF rows into a single block of
+ *  characters so that a client (Python) can get a whole set of rows
+ *  through a single call instead of one call per field.
+ */
+
+#include "libgtftk.h"
+
+/*
+ * external functions declaration
+ */
+extern int split_ip(char ***tab, char *s, char *delim);
+
+/*
+ * This function serializes the rows [from, to[ of a GTF_DATA into a single
+ * block of NUL terminated strings. For each row, the block contains the rank,
+ * the number of attributes, the 8 first fields and then the key/value pairs
+ * of the attributes. The block must be released by the client with free_mem.
+ *
+ * Parameters:
+ * 		gtf_data:	the GTF data
+ * 		from:		the first row to serialize
+ * 		to:			the row following the last row to serialize
+ * 		size:		a pointer to store the size (in bytes) of the block
+ *
+ * Returns:			the block of strings
+ */
+__attribute__ ((visibility ("default")))
+char *get_rows_block(GTF_DATA *gtf_data, int from, int to, int *size) {
+	int i, k, nb;
+	size_t l;
+	long int len = 0;
+	char *block, *p;
+	GTF_ROW *row;
+
+	/*
+	 * first pass to compute the size of the block (the rank and the
+	 * number of attributes need at most 12 characters each)
+	 */
+	for (i = from; i < to; i++) {
+		row = gtf_data->data[i];
+		len += 24;
+		for (k = 0; k < 8; k++) len += strlen(row->field[k]) + 1;
+		for (k = 0; k < row->attributes.nb; k++)
+			len += strlen((row->attributes.attr + k)->key) + strlen((row->attributes.attr + k)->value) + 2;
+	}
+
+	block = p = (char *)calloc(len + 1, sizeof(char));
+
+	/*
+	 * second pass to copy the tokens
+	 */
+	for (i = from; i < to; i++) {
+		row = gtf_data->data[i];
+		nb = row->attributes.nb > 0 ? row->attributes.nb : 0;
+		p += sprintf(p, "%d", row->rank) + 1;
+		p += sprintf(p, "%d", nb) + 1;
+		for (k = 0; k < 8; k++) {
+			l = strlen(row->field[k]) + 1;
+			memcpy(p, row->field[k], l);
+			p += l;
+		}
+		for (k = 0; k < nb; k++) {
+			l = strlen((row->attributes.attr + k)->key) + 1;
+			memcpy(p, (row->attributes.attr + k)->key, l);
+			p += l;
+			l = strlen((row->attributes.attr + k)->value) + 1;
+			memcpy(p, (row->attributes.attr + k)->value, l);
+			p += l;
+		}
+	}
+
+	*size = (int)(p - block);
+	return block;
+}
+
+/*
+ * This function serializes the rows [from, to[ of a RAW_DATA (the result of
+ * extract_data) into a single block of NUL terminated strings (nb_columns
+ * strings per row). The block must be released by the client with free_mem.
+ *
+ * Parameters:
+ * 		raw_data:	the RAW_DATA
+ * 		from:		the first row to serialize
+ * 		to:			the row following the last row to serialize
+ * 		size:		a pointer to store the size (in bytes) of the block
+ *
+ * Returns:			the block of strings
+ */
+__attribute__ ((visibility ("default")))
+char *get_raw_rows_block(RAW_DATA *raw_data, int from, int to, int *size) {
+	int i, k;
+	size_t l;
+	long int len = 0;
+	char *block, *p;
+
+	for (i = from; i < to; i++)
+		for (k = 0; k < raw_data->nb_columns; k++)
+			len += strlen(raw_data->data[i][k]) + 1;
+
+	block = p = (char *)calloc(len + 1, sizeof(char));
+
+	for (i = from; i < to; i++)
+		for (k = 0; k < raw_data->nb_columns; k++) {
+			l = strlen(raw_data->data[i][k]) + 1;
+			memcpy(p, raw_data->data[i][k], l);
+			p += l;
+		}
+
+	*size = (int)(p - block);
+	return block;
+}
+
+/*
+ * This function writes the rows [from, to[ of a RAW_DATA as a single block
+ * of text lines: the fields of a row are separated by sep and each row is
+ * terminated by a newline character. Rows containing a field equal to one
+ * of the values listed in skip are not written. The block must be released
+ * by the client with free_mem.
+ *
+ * Parameters:
+ * 		raw_data:	the RAW_DATA
+ * 		from:		the first row to write
+ * 		to:			the row following the last row to write
+ * 		sep:		the field separator
+ * 		skip:		the values (separated by "," character) of the rows to
+ * 					discard (may be empty)
+ * 		size:		a pointer to store the size (in bytes) of the block
+ *
+ * Returns:			the block of text lines
+ */
+__attribute__ ((visibility ("default")))
+char *get_raw_lines_block(RAW_DATA *raw_data, int from, int to, char *sep, char *skip, int *size) {
+	int i, k, j, nb_skip;
+	size_t l, lsep = strlen(sep);
+	long int len = 0;
+	char *block, *p, **skip_list, *skip_copy = strdup(skip);
+
+	nb_skip = split_ip(&skip_list, skip_copy, ",");
+
+	for (i = from; i < to; i++)
+		for (k = 0; k < raw_data->nb_columns; k++)
+			len += strlen(raw_data->data[i][k]) + lsep;
+
+	block = p = (char *)calloc(len + (to - from) + 1, sizeof(char));
+
+	for (i = from; i < to; i++) {
+		/*
+		 * look for a value to discard in the row
+		 */
+		for (k = 0; k < raw_data->nb_columns; k++) {
+			for (j = 0; j < nb_skip; j++)
+				if (!strcmp(raw_data->data[i][k], skip_list[j])) break;
+			if (j < nb_skip) break;
+		}
+		if (k < raw_data->nb_columns) continue;
+
+		for (k = 0; k < raw_data->nb_columns; k++) {
+			if (k > 0) {
+				memcpy(p, sep, lsep);
+				p += lsep;
+			}
+			l = strlen(raw_data->data[i][k]);
+			memcpy(p, raw_data->data[i][k], l);
+			p += l;
+		}
+		*p++ = '\n';
+	}
+
+	free(skip_list);
+	free(skip_copy);
+	*size = (int)(p - block);
+	return block;
+}
@@ -19,6 +19,7 @@
  */
 extern TEXTFILE_READER *get_gtf_reader(char *query);
 extern char *get_next_gtf_line(TEXTFILE_READER *gr, char *buffer);
+extern void free_gtf_reader(TEXTFILE_READER *gr);
 
 /*
  * external functions in column.c
@@ -309,10 +310,7 @@ GTF_DATA *load_GTF(char *input) {
 	 * free the buffer used to read GTF file
 	 */
 	free(buffer);
-	if (gr != NULL) {
-		free(gr->filename);
-		free(gr);
-	}
+	if (gr != NULL) free_gtf_reader(gr);
 	return ret;
 }
 
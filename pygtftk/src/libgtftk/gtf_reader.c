@@ -7,6 +7,7 @@
  *  Contains the functions for GTF file reading :
  *  	get_next_gtf_line:	reads a line from input (plain or gzipped GTF file, or standard input)
  *  	get_gtf_reader:		create an appropriate GTF reader depending on the query
+ *  	free_gtf_reader:	close the input and free a GTF reader
  */
 
 #include "libgtftk.h"
@@ -16,9 +17,27 @@
  * or NULL if the EOF has been reached
  */
 char *get_next_gtf_line(TEXTFILE_READER *gr, char *buffer) {
-	char *ret = NULL;
+	char *ret = NULL, *start, *eol;
+	size_t l;
 
-	if (gr->gz) {
+	if (gr->map != NULL) {
+		/*
+		 * same behavior as fgets: copy the row with its '\n' (at most 9999
+		 * characters) at the end of the mapping
+		 */
+		if (gr->map_pos < gr->map_size) {
+			start = gr->map + gr->map_pos;
+			l = gr->map_size - gr->map_pos;
+			eol = (char *)memchr(start, '\n', l);
+			if (eol != NULL) l = eol - start + 1;
+			if (l > 9999) l = 9999;
+			memcpy(buffer, start, l);
+			*(buffer + l) = 0;
+			gr->map_pos += l;
+			ret = buffer;
+		}
+	}
+	else if (gr->gz) {
 		if (gzgets(gr->gzfile, buffer, 10000) != Z_NULL)
 			ret = buffer;
 	}
@@ -29,6 +48,38 @@ char *get_next_gtf_line(TEXTFILE_READER *gr, char *buffer) {
 	return ret;
 }
 
+/*
+ * Try to map a plain file in memory. The file is then read from the mapping
+ * (see get_next_gtf_line) instead of with fgets. If the file can not be
+ * mapped (e.g. an empty file or a pipe), it is read with plainfile.
+ */
+static void map_gtf_file(TEXTFILE_READER *gr) {
+	struct stat st;
+	char *map;
+
+	gr->map = NULL;
+	if (gr->plainfile == NULL) return;
+	if (fstat(fileno(gr->plainfile), &st) || !S_ISREG(st.st_mode) || st.st_size == 0) return;
+	map = (char *)mmap(NULL, st.st_size, PROT_READ, MAP_PRIVATE, fileno(gr->plainfile), 0);
+	if (map == MAP_FAILED) return;
+	madvise(map, st.st_size, MADV_SEQUENTIAL);
+	gr->map = map;
+	gr->map_size = st.st_size;
+	gr->map_pos = 0;
+}
+
+/*
+ * Close the input file (but not the standard input) and free the memory
+ * used by a GTF reader.
+ */
+void free_gtf_reader(TEXTFILE_READER *gr) {
+	if (gr->map != NULL) munmap(gr->map, gr->map_size);
+	if (gr->gzfile != NULL) gzclose(gr->gzfile);
+	if (gr->plainfile != NULL && gr->plainfile != stdin) fclose(gr->plainfile);
+	free(gr->filename);
+	free(gr);
+}
+
 /*
  * This function analyzes "query" and constructs a TEXTFILE_READER object
  * containing :
@@ -85,6 +136,7 @@ TEXTFILE_READER *get_gtf_reader(char *query) {
 			gr->plainfile = fopen(gr->filename, "ro");
 			gr->gzfile = NULL;
 			gr->gz = 0;
+			map_gtf_file(gr);
 		}
 		else if (!strcmp(query_filename, "-")) {
 			gr->plainfile = stdin;
@@ -100,6 +152,7 @@ TEXTFILE_READER *get_gtf_reader(char *query) {
 			gr->plainfile = fopen(gr->filename, "ro");
 			gr->gzfile = NULL;
 			gr->gz = 0;
+			map_gtf_file(gr);
 		}
 	}
 	else {
@@ -37,17 +37,33 @@ extern void print_row(FILE *output, GTF_ROW *r, char delim, int add_chr);
 int split_ip(char ***tab, char *s, char *delim) {
 	int i, n, k, in_token, l;
 
+	char *p, *q, *e;
+
 	in_token = n = k = 0;
 	l = strlen(s);
-	for (i = 0; i < l; i++)
-		if (strchr(delim, (int)(*(s + i))) != NULL) {
-			*(s + i) = 0;
-			in_token = 0;
-		}
-		else if (!in_token) {
-			in_token = 1;
-			n++;
+	if (*delim != 0 && *(delim + 1) == 0) {
+		/*
+		 * only one delimiter (e.g. "\t" for GTF rows): look for it with
+		 * memchr (vectorized in glibc) instead of testing each character
+		 */
+		e = s + l;
+		for (p = s; p < e; p = q + 1) {
+			q = (char *)memchr(p, *delim, e - p);
+			if (q == NULL) q = e;
+			if (q > p) n++;
+			*q = 0;
 		}
+	}
+	else
+		for (i = 0; i < l; i++)
+			if (strchr(delim, (int)(*(s + i))) != NULL) {
+				*(s + i) = 0;
+				in_token = 0;
+			}
+			else if (!in_token) {
+				in_token = 1;
+				n++;
+			}
 	*tab = (char **)calloc(n, sizeof(char *));
 	for (i = 0; i < l; i++)
 		if (*(s + i ) != 0) {
@@ -194,11 +210,27 @@ int add_row_list(ROW_LIST *src, ROW_LIST *dst) {
  */
 __attribute__ ((visibility ("default")))
 void print_gtf_data(GTF_DATA *gtf_data, char *output, int add_chr) {
-	int i;
+	int i, fd;
 	FILE *out = stdout;
 
 	if (gtf_data != NULL) {
-		if (*output != '-') out = fopen(output, "w");
+		if (*output != '-')
+			out = fopen(output, "w");
+		else {
+			/*
+			 * write the standard output through a duplicate of its
+			 * descriptor, so that the buffer size can be set whatever
+			 * the previous uses of stdout
+			 */
+			fflush(stdout);
+			out = NULL;
+			if ((fd = dup(fileno(stdout))) != -1)
+				if ((out = fdopen(fd, "w")) == NULL) close(fd);
+		}
+		/*
+		 * use a 1Mb buffer to reduce the number of write calls
+		 */
+		if (out != NULL) setvbuf(out, NULL, _IOFBF, 1 << 20);
 		if (out == NULL) out = stdout;
 		for (i = 0; i < gtf_data->size; i++) print_row(out, gtf_data->data[i], '\t', add_chr);
 		if (out != stdout) {
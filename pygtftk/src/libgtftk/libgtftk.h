@@ -26,6 +26,8 @@
 #include <errno.h>
 #include <ctype.h>
 #include <unistd.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
 
 /*
  * Debug of memory allocation. Must be linked with libmemory.so shared library.
@@ -104,6 +106,13 @@ typedef struct TEXTFILE_READER {
 	 * The plain file descriptor
 	 */
 	FILE *plainfile;
+
+	/*
+	 * The content of a plain file mapped in memory (NULL if the file is
+	 * read with plainfile), its size and the position of the next row
+	 */
+	char *map;
+	size_t map_size, map_pos;
 } TEXTFILE_READER;
 
 /*
@@ -421,6 +430,7 @@ TTEXT *get_attribute_values_list(GTF_DATA *gtf_data, char *attribute);
 int get_type(GTF_DATA *gtf_data, char *key, int ignore_undef);
 GTF_DATA *convert_to_ensembl(GTF_DATA *gtf_data);
 GTF_DATA *add_attributes(GTF_DATA *gtf_data, char *features, char *key, char *new_key, char *inputfile_name);
+GTF_DATA *add_attributes_multi(GTF_DATA *gtf_data, char *features, char *key, char *inputfile_name);
 GTF_DATA *del_attributes(GTF_DATA *gtf_data, char *features, char *keys);
 GTF_DATA *select_by_positions(GTF_DATA *gtf_data, int *pos, int size);
 GTF_DATA *add_exon_number(GTF_DATA *gtf_data, char *exon_number_field);
@@ -432,5 +442,8 @@ void clear_indexes(void);
 GTF_DATA *add_attr_column(GTF_DATA *gtf_data, char *inputfile_name, char *new_key);
 int int_array_test(int *pos, int size);
 void *print_bed(GTF_DATA *gtf_data, char *output, int add_chr, char *keys, char *sep, char *more_info);
+char *get_rows_block(GTF_DATA *gtf_data, int from, int to, int *size);
+char *get_raw_rows_block(RAW_DATA *raw_data, int from, int to, int *size);
+char *get_raw_lines_block(RAW_DATA *raw_data, int from, int to, char *sep, char *skip, int *size);
 
 #endif /* GTFTOOLKIT_GTFTK_SRC_LIB_LIBGTFTK_H_ */
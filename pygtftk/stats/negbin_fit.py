@@ -95,13 +95,8 @@ def check_negbin_adjustment(obs, mean, var, bins_number=16):
     obs_binned = np.digitize(obs, bins)
 
     # Remark : the last bin (maximum) will disappear. This is an acceptable loss on this kind of distribution.
-    counts = []
-    for binned_value in range(len(bins)):
-        count = np.sum(
-            np.where(obs_binned == binned_value, True, False)
-        )
-        counts.append(count)
-    f_obs = np.array(counts)
+    # All bins are counted in a single pass over obs_binned.
+    f_obs = np.bincount(obs_binned, minlength=len(bins) + 1)[:len(bins)]
 
     ## Compute the expected frequencies : across each bin, "sum the pmf" (obviously done by the difference of two cdf)
     f_exp = []
@@ -2,12 +2,12 @@
 Class declaration of the TAB object (may be returned by a GTF instance).
 """
 
+import sys
 import textwrap
 
 import pandas as pd
 from cffi import FFI
 
-import pygtftk.utils
 from pygtftk.Line import FieldSet
 from pygtftk.utils import GTFtkError
 
@@ -19,6 +19,9 @@ ffi = FFI()
 
 MAX_REPR_LINE = 6
 
+# The number of rows retrieved from libgtftk at once when iterating
+ITER_BLOCK_SIZE = 10000
+
 
 class TAB(object):
     """A class representation of a tabulated matrix. An end product
@@ -77,11 +80,81 @@ class TAB(object):
         >>> assert chr[::-1][0] == 'chr1'
         """
 
-        for i in range(self.nrows):
-            field = FieldSet(self._data.data[i],
-                             size=self.ncols,
-                             ft_type=self.colnames)
-            yield field
+        for fields in self._iter_rows():
+            yield FieldSet._from_batch(fields, self.colnames)
+
+    def _iter_rows(self):
+        """Iterate over the rows as lists of strings. Rows are serialized by
+        libgtftk block by block so that a single call (and a single decoding)
+        is needed per block.
+
+        :Example:
+
+        >>> import pygtftk.tab_interface
+        >>> from  pygtftk.utils import get_example_file
+        >>> from pygtftk.gtf_interface import GTF
+        >>> a_file = get_example_file()[0]
+        >>> a_tab = GTF(a_file).extract_data("gene_id,start,exon_id")
+        >>> rows = list(a_tab._iter_rows())
+        >>> assert len(rows) == 70
+        >>> assert rows[0] == ['G0001', '125', '?']
+        >>> assert rows == [list(a_tab[i]) for i in range(70)]
+        >>> pygtftk.tab_interface.ITER_BLOCK_SIZE = 7
+        >>> assert list(a_tab._iter_rows()) == rows
+        >>> pygtftk.tab_interface.ITER_BLOCK_SIZE = 10000
+        """
+
+        size = ffi.new("int *")
+        ncols = self.ncols
+
+        for first in range(0, self.nrows, ITER_BLOCK_SIZE):
+            last = min(first + ITER_BLOCK_SIZE, self.nrows)
+            block = self._dll.get_raw_rows_block(self._data, first, last, size)
+            tok = str(ffi.buffer(block, size[0]), 'utf-8').split('\0')
+            self._dll.free_mem(block)
+
+            for pos in range(0, (last - first) * ncols, ncols):
+                yield tok[pos:pos + ncols]
+
+    def _iter_line_blocks(self, sep='\t', skip=None):
+        """Iterate over the rows as blocks of text lines (fields separated by
+        sep). The lines are built by libgtftk, block by block. Rows containing
+        one of the values in skip are discarded.
+
+        :Example:
+
+        >>> import pygtftk.tab_interface
+        >>> from  pygtftk.utils import get_example_file
+        >>> from pygtftk.gtf_interface import GTF
+        >>> a_file = get_example_file()[0]
+        >>> a_tab = GTF(a_file).extract_data("gene_id,exon_id")
+        >>> lines = "".join(a_tab._iter_line_blocks(sep=":")).splitlines()
+        >>> assert lines == [":".join(x) for x in a_tab._iter_rows()]
+        >>> pygtftk.tab_interface.ITER_BLOCK_SIZE = 7
+        >>> assert "".join(a_tab._iter_line_blocks(sep=":")).splitlines() == lines
+        >>> pygtftk.tab_interface.ITER_BLOCK_SIZE = 10000
+        >>> lines = "".join(a_tab._iter_line_blocks(sep=":", skip=["?"])).splitlines()
+        >>> assert len(lines) == 25
+        >>> assert lines[0] == 'G0001:G0001T002E001'
+        >>> lines = "".join(a_tab._iter_line_blocks(sep=":", skip=["?", "G0001"])).splitlines()
+        >>> assert len(lines) == 23
+        >>> assert "".join(a_tab._iter_line_blocks(skip=["G0001", "G0002", "G0003", "G0004", "G0005", "G0006", "G0007", "G0008", "G0009", "G0010"])) == ""
+        >>> pygtftk.tab_interface.ITER_BLOCK_SIZE = 7
+        >>> assert "".join(a_tab._iter_line_blocks(sep=":", skip=["?", "G0001"])).splitlines() == lines
+        >>> pygtftk.tab_interface.ITER_BLOCK_SIZE = 10000
+        """
+
+        size = ffi.new("int *")
+        sep = sep.encode()
+        skip = ",".join(skip if skip is not None else []).encode()
+
+        for first in range(0, self.nrows, ITER_BLOCK_SIZE):
+            last = min(first + ITER_BLOCK_SIZE, self.nrows)
+            block = self._dll.get_raw_lines_block(self._data, first, last,
+                                                  sep, skip, size)
+            lines = str(ffi.buffer(block, size[0]), 'utf-8')
+            self._dll.free_mem(block)
+            yield lines
 
     def iter_as_list(self):
         """
@@ -98,8 +171,8 @@ class TAB(object):
 
         """
 
-        for i in range(self.nrows):
-            yield [ffi.string(x).decode() for x in self._data.data[i][0:self.ncols]]
+        for fields in self._iter_rows():
+            yield fields
 
     def as_data_frame(self):
         """Convert the TAB object into a dataframe.
@@ -114,10 +187,7 @@ class TAB(object):
         >>> assert a_tab.as_data_frame()["gene_id"].nunique() == 10
 
         """
-        out_list = []
-        for i in range(self.nrows):
-            out_list += [[ffi.string(x).decode()
-                          for x in self._data.data[i][0:self.ncols]]]
+        out_list = list(self._iter_rows())
         df = pd.DataFrame(out_list, columns=self.colnames)
         return df
 
@@ -192,9 +262,13 @@ class TAB(object):
         else:
             return 0
 
-    def write(self, outfile=None, sep='\t'):
+    def write(self, outfile=None, sep='\t', skip=None):
         """Write a tab object to a file.
 
+        :param outfile: The output file object.
+        :param sep: The output field separator.
+        :param skip: A list of values. Rows containing one of them are not written.
+
         :Example:
 
         >>> from  pygtftk.utils import get_example_file
@@ -209,10 +283,18 @@ class TAB(object):
         >>> out_file.close()
         >>> assert simple_line_count(out_file) == 70
         >>> assert simple_nb_column(out_file) == 2
+        >>> out_file = make_tmp_file()
+        >>> a_tab.write(out_file, skip=['?'])
+        >>> out_file.close()
+        >>> assert simple_line_count(out_file) == 60
         """
 
-        for i in self:
-            pygtftk.utils.write_properly(sep.join(list(i)), outfile)
+        # Same destination as pygtftk.utils.write_properly()
+        if outfile is None or outfile.name in ['<stdout>', '-']:
+            outfile = sys.stdout
+
+        for lines in self._iter_line_blocks(sep, skip):
+            outfile.write(lines)
 
     def as_simple_list(self, which_col=0):
         """Convert the selected column of a TAB object into a list.
@@ -254,11 +336,8 @@ class TAB(object):
         >>> assert 'CDS_G0010T001' in list(i)
         """
         yield FieldSet(alist=self.colnames)
-        for i in range(self.nrows):
-            field = FieldSet(self._data.data[i],
-                             size=self.ncols,
-                             ft_type=self.colnames)
-            yield field
+        for fields in self._iter_rows():
+            yield FieldSet._from_batch(fields, self.colnames)
 
 
 if __name__ == "__main__":
@@ -43,6 +43,9 @@ ADD_CHR = 0
 # Whether chromosome file has been checked
 CHROM_CHECKED = False
 
+# The set of installed R packages (R is only queried once)
+R_PKG_INSTALLED = None
+
 # Characters
 TAB = '\t'
 NEWLINE = '\n'
@@ -1152,17 +1155,16 @@ def check_r_packages(r_pkg_list=None, no_error=True):
     >>> from pygtftk.utils import check_r_packages
     """
 
-    p1 = Popen(["echo",
-                "paste(rownames(installed.packages()), collapse=',')"],
-               stdout=PIPE)
-    p2 = Popen(["R", "--slave"], stdin=p1.stdout, stdout=PIPE)
-    p1.stdout.close()
-    installed, err = p2.communicate()
-    installed = re.sub('^.*?"', '', installed)
-    installed = re.sub('".*\n', '', installed)
-    installed = installed.split(",")
-
-    r_pkg_not_found = list(set(r_pkg_list) - set(installed))
+    if pygtftk.utils.R_PKG_INSTALLED is None:
+        # The R code is sent through stdin (no 'echo' process)
+        p = Popen(["R", "--slave"], stdin=PIPE, stdout=PIPE,
+                  universal_newlines=True)
+        installed, err = p.communicate("paste(rownames(installed.packages()), collapse=',')\n")
+        installed = re.sub('^.*?"', '', installed)
+        installed = re.sub('".*\n', '', installed)
+        pygtftk.utils.R_PKG_INSTALLED = set(installed.split(","))
+
+    r_pkg_not_found = list(set(r_pkg_list) - pygtftk.utils.R_PKG_INSTALLED)
 
     if len(r_pkg_not_found) > 0:
         message("Required R packages: " + " ".join(r_pkg_not_found),
@@ -214,6 +214,11 @@ cython_ologram_4 = Extension(name='pygtftk.stats.multiprocessing.multiproc',
                              extra_compile_args=extra_comp_cython, extra_link_args=extra_link_cython,
                              language='c')
 
+cython_line_fmt = Extension(name='pygtftk._line_fmt',
+                            sources=["pygtftk/_line_fmt.pyx"],
+                            extra_compile_args=extra_comp_cython, extra_link_args=extra_link_cython,
+                            language='c')
+
 # ----------------------------------------------------------------------
 # Description
 # ----------------------------------------------------------------------
@@ -348,7 +353,8 @@ setup(name="pygtftk",
                   'twine >=3.4.1'],
           'gffutils': ['gffutils']},
       install_requires=pack_required,
-      ext_modules=[lib_pygtftk] + [cython_ologram_1, cython_ologram_2, cython_ologram_3, cython_ologram_4])
+      ext_modules=[lib_pygtftk] + [cython_ologram_1, cython_ologram_2, cython_ologram_3, cython_ologram_4,
+                                                  cython_line_fmt])
 
 # ----------------------------------------------------------------------
 # Update gtftk config directory